@@ -1,3 +1,8 @@
+import html
+import uuid
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+
 import streamlit as st
 from src.drift_detector import IntentDriftDetector
 
@@ -52,6 +57,8 @@ st.markdown("""
         gap: 0.5rem;
     }
     
+    .intent-note { margin-top: 0.3rem; font-size: 0.85rem; color: #6b7280; }
+    
     /* Input Field Fix */
     .stChatInput { position: fixed; bottom: 0; }
     
@@ -61,6 +68,12 @@ st.markdown("""
 </style>
 """, unsafe_allow_html=True)
 
+# Turns rendered per page; older history is loaded on request
+HISTORY_PAGE_SIZE = 50
+
+# Seconds between checks for finished detections
+POLL_INTERVAL = 0.3
+
 # --------------------------------------------------
 # Utils
 # --------------------------------------------------
@@ -69,14 +82,104 @@ def get_intent_class(intent_name):
     if not intent_name: return "intent-unknown"
     return f"intent-{intent_name.lower().replace(' ', '-')}"
 
+
+def render_analysis(analysis):
+    """
+    Badge, unclear-input note and drift alert of one turn as a single
+    HTML fragment. Built once per message and stored with it, so reruns
+    only re-send finished strings.
+    """
+    detected = analysis.get("detected_intent", "unknown")
+    current = analysis.get("current_intent") or "unknown"
+    parts = []
+
+    # Check for Unknown Input Case
+    if detected == "unknown" and current != "unknown":
+        # 1. Intent Badge: UNKNOWN
+        parts.append('<span class="intent-badge intent-unknown">Intent: UNKNOWN</span>')
+        # 2. Continuation Message
+        parts.append(
+            '<div class="intent-note">Input unclear, continuing old intent: '
+            f'<b>{html.escape(current.upper())}</b></div>'
+        )
+    else:
+        # Standard Case
+        parts.append(
+            f'<span class="intent-badge {get_intent_class(current)}">'
+            f'Intent: {html.escape(current)}</span>'
+        )
+
+    # 3. Drift Alert (if applicable)
+    if analysis["intent_drift"]:
+        prev = html.escape(analysis["previous_intent"].upper())
+        curr = html.escape(analysis["current_intent"].upper())
+        parts.append(
+            '<div class="drift-alert">'
+            f'<span>🚨 <b>Drift Detected:</b> {prev} → {curr}</span></div>'
+        )
+
+    return "\n".join(parts)
+
+
+def submit_turn(previous, utterance, session_id):
+    """
+    Queue detector.update() behind the session's previous turn (a future
+    from this function, or None). The turn reaches the pool only once
+    `previous` is done, so turns of one session are applied in order
+    while sessions run in parallel, and no worker waits on another.
+    Returns a future of the update() result.
+    """
+    result = Future()
+
+    def run():
+        try:
+            result.set_result(detector.update(utterance, session_id=session_id))
+        except Exception as exc:
+            result.set_exception(exc)
+
+    if previous is None:
+        executor.submit(run)
+    else:
+        # Runs at once if previous is already done
+        previous.add_done_callback(lambda _: executor.submit(run))
+    return result
+
+
+def collect_results():
+    """
+    Attach finished detections to their messages, in order.
+    Returns True if any message was updated.
+    """
+    pending = st.session_state.pending
+    updated = False
+    while pending and pending[0][1].done():
+        msg, future = pending.popleft()
+        try:
+            msg["analysis"] = future.result()
+            msg["html"] = render_analysis(msg["analysis"])
+        except Exception as exc:
+            msg["html"] = f'<div class="intent-note">Detection failed: {html.escape(str(exc))}</div>'
+        updated = True
+    return updated
+
 # --------------------------------------------------
 # Initialize Detector
 # --------------------------------------------------
+# Shared by all browser sessions: the model is loaded once, while drift
+# state is kept per session inside the detector's session store.
+# The model loads in the background so the first page renders immediately.
 @st.cache_resource
 def load_detector():
-    return IntentDriftDetector()
+    return IntentDriftDetector(background=True)
+
+# Detection runs here rather than in the script run, so a rerun (and the
+# input box) never waits for the encoder.
+@st.cache_resource
+def load_executor():
+    return ThreadPoolExecutor(max_workers=4, thread_name_prefix="detect")
 
 detector = load_detector()
+executor = load_executor()
 
 # --------------------------------------------------
 # Session State
@@ -87,16 +190,38 @@ if "messages" not in st.session_state:
 if "turn_count" not in st.session_state:
     st.session_state.turn_count = 0
 
+if "session_id" not in st.session_state:
+    st.session_state.session_id = uuid.uuid4().hex
+
+if "pending" not in st.session_state:
+    # (message, future) pairs awaiting their detection, oldest first
+    st.session_state.pending = deque()
+
+if "history_shown" not in st.session_state:
+    st.session_state.history_shown = HISTORY_PAGE_SIZE
+
+collect_results()
+
 # --------------------------------------------------
 # Sidebar
 # --------------------------------------------------
 with st.sidebar:
     st.title("🎓 Tracker Status")
+
+    if detector.ready():
+        st.markdown('<div class="status-box status-active">Model ready</div>', unsafe_allow_html=True)
+    else:
+        st.markdown('<div class="status-box">Loading model…</div>', unsafe_allow_html=True)
     
     if st.button("Start New Session", type="primary"):
-        detector.reset()
+        # A detection still in flight would write to the old session id,
+        # so the new session gets a fresh one
+        detector.reset(st.session_state.session_id)
+        st.session_state.session_id = uuid.uuid4().hex
         st.session_state.messages = []
+        st.session_state.pending = deque()
         st.session_state.turn_count = 0
+        st.session_state.history_shown = HISTORY_PAGE_SIZE
         st.rerun()
 
     st.divider()
@@ -119,62 +244,47 @@ with st.sidebar:
 st.markdown("## Student Placement Intent Journey Tracker")
 st.caption("Monitoring intent evolution from ambition to decision.")
 
-# Render Messages
-for msg in st.session_state.messages:
-    # User Message
+# Render Messages: only the latest page, each from its stored HTML
+messages = st.session_state.messages
+first = max(len(messages) - st.session_state.history_shown, 0)
+
+if first:
+    if st.button(f"Show earlier messages ({first} hidden)"):
+        st.session_state.history_shown += HISTORY_PAGE_SIZE
+        st.rerun()
+
+for msg in messages[first:]:
     with st.chat_message("user"):
         st.write(msg["content"])
-        
-        # Metadata Display
-        analysis = msg["analysis"]
-        detected = analysis.get("detected_intent", "unknown")
-        current = analysis.get("current_intent", "unknown")
-        
-        # Check for Unknown Input Case
-        if detected == "unknown" and current != "unknown":
-            # 1. Intent Badge: UNKNOWN
-            st.markdown(f"""
-                <span class="intent-badge intent-unknown">
-                    Intent: UNKNOWN
-                </span>
-            """, unsafe_allow_html=True)
-            
-            # 2. Continuation Message
-            st.caption(f"Input unclear, continuing old intent: **{current.upper()}**")
-            
+        if msg["html"] is None:
+            st.caption("Analyzing…")
         else:
-            # Standard Case
-            css_class = get_intent_class(current)
-            st.markdown(f"""
-                <span class="intent-badge {css_class}">
-                    Intent: {current}
-                </span>
-            """, unsafe_allow_html=True)
-        
-        # 3. Drift Alert (if applicable)
-        if analysis["intent_drift"]:
-            prev = analysis["previous_intent"]
-            curr = analysis["current_intent"]
-            st.markdown(f"""
-                <div class="drift-alert">
-                    <span>🚨 <b>Drift Detected:</b> {prev.upper()} → {curr.upper()}</span>
-                </div>
-            """, unsafe_allow_html=True)
+            st.markdown(msg["html"], unsafe_allow_html=True)
+
+
+@st.fragment(run_every=POLL_INTERVAL)
+def await_detections():
+    """Poll without re-running the page; rerun it once a turn is ready."""
+    if collect_results():
+        st.rerun()
+
+
+if st.session_state.pending:
+    await_detections()
 
 # --------------------------------------------------
 # Chat Input
 # --------------------------------------------------
 if prompt := st.chat_input("Type your message..."):
     st.session_state.turn_count += 1
-    
-    # Run Detection
-    result = detector.update(prompt)
-    
-    # Store message + analysis
-    st.session_state.messages.append({
-        "role": "user",
-        "content": prompt,
-        "analysis": result
-    })
-    
+
+    # Store the message now; its analysis arrives from the executor
+    msg = {"role": "user", "content": prompt, "analysis": None, "html": None}
+    st.session_state.messages.append(msg)
+
+    pending = st.session_state.pending
+    previous = pending[-1][1] if pending else None
+    future = submit_turn(previous, prompt, st.session_state.session_id)
+    pending.append((msg, future))
+
     st.rerun()
@@ -0,0 +1,272 @@
+import threading
+import time
+
+import numpy as np
+
+UNKNOWN_LABEL = "unknown"
+
+# Columns of the per-window counters
+_TURNS, _DRIFTS, _UNKNOWN = range(3)
+
+
+class DriftAggregator:
+    """
+    Streaming fleet-wide rollup of update() results.
+
+    Consumes result dicts and keeps only counts: an intent transition
+    matrix (previous -> current intent of every confirmed drift),
+    detected-intent counts, drift and unknown counts, and per-intent
+    confidence histograms. No utterance text is stored.
+
+    Recent activity is also kept in a ring of n_windows fixed-width time
+    windows (turns, drifts, unknowns and intent counts per window), so
+    memory stays constant however long the aggregator runs; a turn older
+    than the ring only reaches the all-time totals.
+
+    Aggregates built by separate workers are combined with merge(); they
+    pickle without their lock, so they can be shipped between processes.
+    Intents are matched by label, so workers may have seen intents in a
+    different order.
+    """
+
+    def __init__(
+        self,
+        window_seconds: float = 60.0,
+        n_windows: int = 60,
+        confidence_bins: int = 20,
+    ):
+        """
+        window_seconds:
+            Width of one time window.
+
+        n_windows:
+            Windows kept; older ones are overwritten.
+
+        confidence_bins:
+            Equal-width histogram bins over [0, 1]. Confidences outside
+            the range fall into the first or last bin.
+        """
+        if window_seconds <= 0:
+            raise ValueError("window_seconds must be positive")
+        if n_windows < 1 or confidence_bins < 1:
+            raise ValueError("n_windows and confidence_bins must be at least 1")
+
+        self.window_seconds = float(window_seconds)
+        self.n_windows = n_windows
+        self.confidence_bins = confidence_bins
+
+        self.labels = []
+        self._index = {}
+
+        self.turns = 0
+        self.drifts = 0
+        self.intent_counts = np.zeros(0, dtype=np.int64)
+        self.transitions = np.zeros((0, 0), dtype=np.int64)
+        self.confidence = np.zeros((0, confidence_bins), dtype=np.int64)
+
+        self.window_ids = np.full(n_windows, -1, dtype=np.int64)
+        self.window_counts = np.zeros((n_windows, 3), dtype=np.int64)
+        self.window_intents = np.zeros((n_windows, 0), dtype=np.int64)
+
+        self._lock = threading.Lock()
+        self._code(UNKNOWN_LABEL)
+
+    # ------------------------------------------------------------------
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        del state["_lock"]
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
+
+    # ------------------------------------------------------------------
+
+    def add(self, result, timestamp: float = None):
+        """Fold one update() result in."""
+        self.add_many([result], None if timestamp is None else [timestamp])
+
+    def add_many(self, results, timestamps=None):
+        """
+        Fold a batch of update() results in. timestamps (seconds since
+        the epoch, one per result) default to now.
+        """
+        results = list(results)
+        if not results:
+            return
+
+        if timestamps is None:
+            timestamps = np.full(len(results), time.time())
+        window_ids = np.floor(np.asarray(timestamps, dtype=np.float64) / self.window_seconds)
+        window_ids = window_ids.astype(np.int64)
+
+        with self._lock:
+            detected = np.array(
+                [self._code(r.get("detected_intent") or UNKNOWN_LABEL) for r in results],
+                dtype=np.int64,
+            )
+            confidence = np.array([r.get("confidence", 0.0) for r in results], dtype=np.float64)
+            drift = np.array([bool(r.get("intent_drift")) for r in results])
+            unknown = detected == self._index[UNKNOWN_LABEL]
+
+            flows = [
+                (self._code(r["previous_intent"]), self._code(r["current_intent"]))
+                for r, drifted in zip(results, drift)
+                if drifted and r.get("previous_intent") is not None
+            ]
+
+            self.turns += len(results)
+            self.drifts += int(drift.sum())
+            np.add.at(self.intent_counts, detected, 1)
+            np.add.at(self.confidence, (detected, self._bins(confidence)), 1)
+            if flows:
+                source, target = np.array(flows, dtype=np.int64).T
+                np.add.at(self.transitions, (source, target), 1)
+
+            slots = self._open_windows(window_ids)
+            live = slots >= 0
+            slots, detected = slots[live], detected[live]
+            np.add.at(self.window_counts[:, _TURNS], slots, 1)
+            np.add.at(self.window_counts[:, _DRIFTS], slots, drift[live].astype(np.int64))
+            np.add.at(self.window_counts[:, _UNKNOWN], slots, unknown[live].astype(np.int64))
+            np.add.at(self.window_intents, (slots, detected), 1)
+
+    # ------------------------------------------------------------------
+
+    def merge(self, other: "DriftAggregator"):
+        """Add another aggregate (e.g. from another worker) into this one."""
+        if (
+            other.window_seconds != self.window_seconds
+            or other.n_windows != self.n_windows
+            or other.confidence_bins != self.confidence_bins
+        ):
+            raise ValueError("cannot merge aggregates with different window or bin settings")
+        if other is self:
+            raise ValueError("cannot merge an aggregate into itself")
+
+        with other._lock:
+            theirs = other.__getstate__()
+            theirs = {k: v.copy() if isinstance(v, np.ndarray) else v for k, v in theirs.items()}
+            labels = list(other.labels)
+
+        with self._lock:
+            mapping = np.array([self._code(label) for label in labels], dtype=np.int64)
+            columns = np.ix_(mapping, mapping)
+
+            self.turns += theirs["turns"]
+            self.drifts += theirs["drifts"]
+            self.intent_counts[mapping] += theirs["intent_counts"]
+            self.transitions[columns] += theirs["transitions"]
+            self.confidence[mapping] += theirs["confidence"]
+
+            for slot, window_id in enumerate(theirs["window_ids"]):
+                if window_id < 0:
+                    continue
+                target = self._open_windows(np.array([window_id]))[0]
+                if target < 0:
+                    continue
+                self.window_counts[target] += theirs["window_counts"][slot]
+                self.window_intents[target, mapping] += theirs["window_intents"][slot]
+
+    # ------------------------------------------------------------------
+
+    def summary(self, last_windows: int = None):
+        """
+        JSON-friendly dashboard view: totals, rates, non-zero transitions,
+        confidence histograms and the live windows, oldest first
+        (only the newest last_windows of them if given).
+        """
+        with self._lock:
+            turns = self.turns
+            unknown = int(self.intent_counts[self._index[UNKNOWN_LABEL]])
+            edges = np.linspace(0.0, 1.0, self.confidence_bins + 1)
+
+            source, target = np.nonzero(self.transitions)
+            transitions = {}
+            for i, j in zip(source.tolist(), target.tolist()):
+                transitions.setdefault(self.labels[i], {})[self.labels[j]] = int(self.transitions[i, j])
+
+            # Slots not reused since the ring moved past them are expired
+            oldest = int(self.window_ids.max()) - self.n_windows + 1
+            order = np.argsort(self.window_ids)
+            order = order[self.window_ids[order] >= max(oldest, 0)]
+            if last_windows is not None:
+                order = order[len(order) - last_windows:] if last_windows > 0 else order[:0]
+
+            windows = []
+            for slot in order.tolist():
+                counts = self.window_counts[slot]
+                windows.append({
+                    "start": float(self.window_ids[slot] * self.window_seconds),
+                    "turns": int(counts[_TURNS]),
+                    "drifts": int(counts[_DRIFTS]),
+                    "unknown": int(counts[_UNKNOWN]),
+                    "intents": self._label_counts(self.window_intents[slot]),
+                })
+
+            return {
+                "turns": turns,
+                "drifts": self.drifts,
+                "unknown": unknown,
+                "drift_rate": round(self.drifts / turns, 4) if turns else 0.0,
+                "unknown_rate": round(unknown / turns, 4) if turns else 0.0,
+                "intents": self._label_counts(self.intent_counts),
+                "transitions": transitions,
+                "confidence_histogram": {
+                    "edges": np.round(edges, 4).tolist(),
+                    "counts": {
+                        label: self.confidence[i].tolist()
+                        for i, label in enumerate(self.labels)
+                        if self.intent_counts[i]
+                    },
+                },
+                "window_seconds": self.window_seconds,
+                "windows": windows,
+            }
+
+    # ------------------------------------------------------------------
+
+    def _code(self, label) -> int:
+        """Row of a label, growing every per-intent array on first sight."""
+        label = str(label)
+        code = self._index.get(label)
+        if code is not None:
+            return code
+
+        code = self._index[label] = len(self.labels)
+        self.labels.append(label)
+        n = len(self.labels)
+        self.intent_counts = np.pad(self.intent_counts, (0, 1))
+        self.transitions = np.pad(self.transitions, ((0, 1), (0, 1)))
+        self.confidence = np.pad(self.confidence, ((0, 1), (0, 0)))
+        self.window_intents = np.pad(self.window_intents, ((0, 0), (0, n - self.window_intents.shape[1])))
+        return code
+
+    def _bins(self, confidence):
+        bins = np.floor(confidence * self.confidence_bins).astype(np.int64)
+        return np.clip(bins, 0, self.confidence_bins - 1)
+
+    def _open_windows(self, window_ids):
+        """
+        Ring slot of each window id, clearing slots that held an older
+        window. -1 for windows that have already been overwritten.
+        """
+        slots = window_ids % self.n_windows
+        oldest = max(int(self.window_ids.max()), int(window_ids.max())) - self.n_windows + 1
+        for window_id in np.unique(window_ids).tolist():
+            slot = window_id % self.n_windows
+            held = self.window_ids[slot]
+            if window_id < oldest:
+                slots[window_ids == window_id] = -1
+            elif held < window_id:
+                self.window_ids[slot] = window_id
+                self.window_counts[slot] = 0
+                self.window_intents[slot] = 0
+            elif held > window_id:
+                slots[window_ids == window_id] = -1
+        return slots
+
+    def _label_counts(self, counts):
+        return {self.labels[i]: int(counts[i]) for i in np.flatnonzero(counts).tolist()}
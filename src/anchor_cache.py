@@ -0,0 +1,97 @@
+import hashlib
+import json
+import os
+import tempfile
+
+import numpy as np
+
+# Override with INTENT_DRIFT_CACHE_DIR, e.g. to point workers at a shared volume.
+DEFAULT_CACHE_DIR = os.environ.get(
+    "INTENT_DRIFT_CACHE_DIR",
+    os.path.join(os.path.expanduser("~"), ".cache", "intent-drift"),
+)
+
+
+def anchor_cache_key(
+    model_name: str, model_revision, intent_anchors, backend: str = "torch"
+) -> str:
+    """
+    Stable key for a set of anchor embeddings.
+
+    Covers the model name, revision and inference backend and every
+    anchor sentence in order, so editing, adding or reordering anchors
+    yields a new key.
+    """
+    payload = json.dumps(
+        {
+            "model": model_name,
+            "revision": model_revision,
+            "backend": backend,
+            "anchors": intent_anchors,
+        },
+        ensure_ascii=False,
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()[:32]
+
+
+def _cache_path(cache_dir: str, key: str) -> str:
+    return os.path.join(cache_dir, f"anchors-{key}.npy")
+
+
+def load_anchor_embeddings(cache_dir: str, key: str, n_anchors: int):
+    """
+    Memory-map cached anchor embeddings.
+
+    Returns a read-only (n_anchors, dim) array, or None when there is
+    no usable cache entry (missing, unreadable or wrong shape).
+    """
+    path = _cache_path(cache_dir, key)
+    if not os.path.exists(path):
+        return None
+
+    try:
+        embeddings = np.load(path, mmap_mode="r")
+    except (OSError, ValueError):
+        return None
+
+    if embeddings.ndim != 2 or embeddings.shape[0] != n_anchors:
+        return None
+
+    return embeddings
+
+
+def save_anchor_embeddings(cache_dir: str, key: str, embeddings) -> bool:
+    """
+    Write anchor embeddings to the cache. Returns True once the entry is
+    in place.
+
+    The file is written under a temporary name and renamed into place,
+    so concurrent workers never read a partially written entry.
+    Failures are ignored: the cache is an optimisation, not a requirement.
+    """
+    try:
+        os.makedirs(cache_dir, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=cache_dir, suffix=".npy.tmp")
+    except OSError:
+        return False
+
+    try:
+        with os.fdopen(fd, "wb") as f:
+            np.save(f, np.ascontiguousarray(embeddings, dtype=np.float32))
+        os.replace(tmp_path, _cache_path(cache_dir, key))
+        return True
+    except OSError:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        return False
+
+
+def remove_anchor_embeddings(cache_dir: str, key: str) -> None:
+    """
+    Delete a cache entry. Missing entries and failures (e.g. a file still
+    memory-mapped on Windows) are ignored.
+    """
+    try:
+        os.remove(_cache_path(cache_dir, key))
+    except OSError:
+        pass
@@ -0,0 +1,147 @@
+import numpy as np
+
+from src.ann import IVFIndex
+from src.lexical import LexicalIntentModel
+
+
+class AnchorIndex:
+    """
+    Immutable snapshot of an anchor set and everything derived from it.
+
+    Keeps every anchor embedding plus a running float64 sum per intent,
+    so adding or removing sentences only touches the affected intent's
+    sum and never re-encodes existing anchors. Changes produce a new
+    snapshot; the classifier swaps its reference in one assignment, so a
+    concurrent detect call sees either the old or the new set, never a
+    half-built one.
+    """
+
+    def __init__(
+        self, anchors, vectors, sums, lexical: bool = False, knn: bool = False, projection=None
+    ):
+        """
+        anchors:    intent -> tuple of sentences
+        vectors:    intent -> (n_sentences, dim) float32 embeddings
+        sums:       intent -> (dim,) float64 sum of that intent's embeddings
+        lexical:    also build the n-gram fast-path model
+        knn:        also build a nearest-anchor index over every embedding
+        projection: optional EmbeddingProjection (src.compression) for the
+                    scoring matrix and the nearest-anchor index; vectors
+                    and sums stay full precision for later updates
+        """
+        self.anchors = anchors
+        self.vectors = vectors
+        self.sums = sums
+        self.projection = projection
+
+        # Row-index -> label and the L2-normalized centroid matrix
+        self.labels = np.array(list(anchors))
+        self.matrix = self.centroids()
+        if projection is not None:
+            self.matrix = projection.apply(self.matrix)
+        # Widened once per snapshot rather than on every scoring call
+        self.scoring_matrix = self.matrix.astype(np.float32, copy=False)
+
+        self.lexical = LexicalIntentModel(anchors) if lexical else None
+
+        # Per-anchor view for nearest-anchor scoring: ANN index row ->
+        # intent row and sentence
+        self.ann = None
+        if knn:
+            flat = self.flat_embeddings()
+            self.ann = IVFIndex(flat if projection is None else projection.apply(flat))
+            self.anchor_intents = np.repeat(
+                np.arange(len(self.labels)), [len(anchors[i]) for i in anchors]
+            )
+            self.anchor_sentences = [s for intent in anchors for s in anchors[intent]]
+
+    # ------------------------------------------------------------------
+
+    @classmethod
+    def from_embeddings(
+        cls, intent_anchors, anchor_embs, lexical: bool = False, knn: bool = False,
+        projection=None,
+    ):
+        """
+        Build from a mapping of intent -> sentences and the embeddings of
+        all sentences in that order, stacked into one (n_anchors, dim) array.
+        """
+        anchors, vectors, sums = {}, {}, {}
+        start = 0
+
+        for intent, sentences in intent_anchors.items():
+            end = start + len(sentences)
+            anchors[intent] = tuple(sentences)
+            vectors[intent] = np.asarray(anchor_embs[start:end], dtype=np.float32)
+            sums[intent] = vectors[intent].sum(axis=0, dtype=np.float64)
+            start = end
+
+        return cls(anchors, vectors, sums, lexical, knn, projection)
+
+    # ------------------------------------------------------------------
+
+    def centroids(self):
+        """Full-precision L2-normalized (n_intents, dim) centroid matrix."""
+        centroids = np.vstack([
+            self.sums[intent] / len(self.anchors[intent]) for intent in self.anchors
+        ])
+        centroids /= np.linalg.norm(centroids, axis=1, keepdims=True)
+        return centroids.astype(np.float32)
+
+    def flat_embeddings(self):
+        """All anchor embeddings stacked in intent order (cache layout)."""
+        return np.vstack([self.vectors[intent] for intent in self.anchors])
+
+    def sentence_vectors(self):
+        """Mapping of anchor sentence -> embedding, across all intents."""
+        return {
+            sentence: vector
+            for intent in self.anchors
+            for sentence, vector in zip(self.anchors[intent], self.vectors[intent])
+        }
+
+    # ------------------------------------------------------------------
+
+    def with_added(self, intent: str, sentences, embeddings):
+        """New snapshot with sentences appended to intent (created if new)."""
+        anchors, vectors, sums = dict(self.anchors), dict(self.vectors), dict(self.sums)
+        embeddings = np.asarray(embeddings, dtype=np.float32)
+
+        if intent in anchors:
+            anchors[intent] = anchors[intent] + tuple(sentences)
+            vectors[intent] = np.vstack([vectors[intent], embeddings])
+            sums[intent] = sums[intent] + embeddings.sum(axis=0, dtype=np.float64)
+        else:
+            anchors[intent] = tuple(sentences)
+            vectors[intent] = embeddings
+            sums[intent] = embeddings.sum(axis=0, dtype=np.float64)
+
+        return AnchorIndex(
+            anchors, vectors, sums, self.lexical is not None, self.ann is not None,
+            self.projection,
+        )
+
+    def with_removed(self, intent: str, sentences=None):
+        """
+        New snapshot without the given sentences of intent, or without
+        the whole intent when sentences is None or nothing would remain.
+        """
+        anchors, vectors, sums = dict(self.anchors), dict(self.vectors), dict(self.sums)
+
+        if sentences is not None:
+            drop = set(sentences)
+            keep = np.array([s not in drop for s in anchors[intent]], dtype=bool)
+
+        if sentences is None or not keep.any():
+            del anchors[intent], vectors[intent], sums[intent]
+            if not anchors:
+                raise ValueError("cannot remove the last intent")
+        else:
+            sums[intent] = sums[intent] - vectors[intent][~keep].sum(axis=0, dtype=np.float64)
+            anchors[intent] = tuple(s for s, k in zip(anchors[intent], keep) if k)
+            vectors[intent] = vectors[intent][keep]
+
+        return AnchorIndex(
+            anchors, vectors, sums, self.lexical is not None, self.ann is not None,
+            self.projection,
+        )
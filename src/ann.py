@@ -0,0 +1,142 @@
+import numpy as np
+
+
+class IVFIndex:
+    """
+    Approximate nearest-neighbour search over L2-normalized vectors
+    (inner product = cosine), in pure NumPy.
+
+    Vectors are clustered with spherical k-means into n_lists inverted
+    lists. A query is compared against the list centroids, and only the
+    n_probe closest lists are scanned exactly. Small collections, where a
+    full scan is already cheap, are searched exactly.
+
+    Vectors keep the dtype they are passed in (e.g. float16 from an
+    EmbeddingProjection) and are widened to float32 a block at a time
+    while scanning, so the stored copy stays compact.
+    """
+
+    def __init__(
+        self,
+        vectors,
+        n_lists: int = None,
+        n_probe: int = 8,
+        exact_below: int = 4096,
+        n_iter: int = 10,
+        seed: int = 0,
+    ):
+        """
+        n_lists:
+            Number of clusters; defaults to ~sqrt(n_vectors).
+
+        n_probe:
+            Lists scanned per query. Higher is more accurate and slower.
+
+        exact_below:
+            Collections smaller than this are searched exhaustively.
+        """
+        self.vectors = np.ascontiguousarray(vectors)
+        if not np.issubdtype(self.vectors.dtype, np.floating):
+            self.vectors = self.vectors.astype(np.float32)
+        self.n_probe = n_probe
+        self.centroids = None
+
+        n = len(self.vectors)
+        if n < exact_below:
+            return
+
+        n_lists = n_lists or max(1, int(np.sqrt(n)))
+        assignment, self.centroids = _spherical_kmeans(
+            self.vectors.astype(np.float32, copy=False), n_lists, n_iter, seed
+        )
+
+        # Store vectors grouped by list so each list is one contiguous slice
+        order = np.argsort(assignment, kind="stable")
+        self.ids = order
+        self.vectors = self.vectors[order]
+        self.offsets = np.searchsorted(assignment[order], np.arange(n_lists + 1))
+
+    # ------------------------------------------------------------------
+
+    def search(self, queries, k: int):
+        """
+        Top-k neighbours of each query.
+        Returns (ids, scores), both (n_queries, k), best first. Ids index
+        the vectors passed to the constructor.
+        """
+        queries = np.atleast_2d(np.asarray(queries, dtype=np.float32))
+        k = min(k, len(self.vectors))
+
+        if self.centroids is None:
+            return _top_k(self._scan(queries, 0, len(self.vectors)), k)
+
+        n_probe = min(self.n_probe, len(self.centroids))
+        probe_lists = np.argpartition(-(queries @ self.centroids.T), n_probe - 1, axis=1)[:, :n_probe]
+
+        ids = np.empty((len(queries), k), dtype=np.intp)
+        scores = np.full((len(queries), k), -np.inf, dtype=np.float32)
+
+        for row, (query, lists) in enumerate(zip(queries, probe_lists)):
+            # Lists are contiguous slices, so score them as views (no copy)
+            spans = [(self.offsets[l], self.offsets[l + 1]) for l in lists]
+            candidate_ids = np.concatenate([self.ids[a:b] for a, b in spans])
+            candidate_scores = np.concatenate([self._scan(query, a, b) for a, b in spans])
+
+            kk = min(k, len(candidate_ids))
+            local_ids, local_scores = _top_k(candidate_scores[None, :], kk)
+            ids[row, :kk] = candidate_ids[local_ids[0]]
+            scores[row, :kk] = local_scores[0]
+            ids[row, kk:] = ids[row, 0]
+
+        return ids, scores
+
+    def _scan(self, queries, start: int, stop: int, block: int = 1024):
+        """
+        float32 scores of queries ((dim,) or (n, dim)) against stored
+        rows start:stop, widening at most `block` rows at a time.
+        """
+        parts = [
+            queries @ self.vectors[a:min(a + block, stop)].astype(np.float32, copy=False).T
+            for a in range(start, stop, block)
+        ]
+        if not parts:
+            return np.zeros(np.shape(queries)[:-1] + (0,), dtype=np.float32)
+        return parts[0] if len(parts) == 1 else np.concatenate(parts, axis=-1)
+
+
+def _top_k(scores, k: int):
+    """Row-wise top-k of a (n, m) score matrix, sorted best first."""
+    part = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+    part_scores = np.take_along_axis(scores, part, axis=1)
+    order = np.argsort(-part_scores, axis=1)
+    return np.take_along_axis(part, order, axis=1), np.take_along_axis(part_scores, order, axis=1)
+
+
+def _spherical_kmeans(vectors, n_clusters: int, n_iter: int, seed: int):
+    """K-means under cosine similarity; returns (assignment, unit centroids)."""
+    rng = np.random.default_rng(seed)
+    centroids = vectors[rng.choice(len(vectors), n_clusters, replace=False)].copy()
+
+    for _ in range(n_iter):
+        assignment = (vectors @ centroids.T).argmax(axis=1)
+
+        # Per-cluster sums via one sort + reduceat (np.add.at is much slower)
+        order = np.argsort(assignment, kind="stable")
+        counts = np.bincount(assignment, minlength=n_clusters)
+        starts = np.concatenate([[0], np.cumsum(counts)[:-1]])
+        nonempty = counts > 0
+
+        sums = np.zeros_like(centroids)
+        sums[nonempty] = np.add.reduceat(vectors[order], starts[nonempty], axis=0)
+        norms = np.linalg.norm(sums, axis=1)
+
+        # Re-seed empty clusters from random vectors
+        empty = norms == 0
+        if empty.any():
+            sums[empty] = vectors[rng.choice(len(vectors), int(empty.sum()), replace=False)]
+            norms[empty] = np.linalg.norm(sums[empty], axis=1)
+
+        centroids = sums / norms[:, None]
+
+    assignment = (vectors @ centroids.T).argmax(axis=1)
+    return assignment, centroids.astype(np.float32)
@@ -0,0 +1,113 @@
+"""
+Check that a reduced-precision backend predicts the same intents as fp32.
+
+    python -m src.backend_check --backend int8 --min-agreement 0.98
+
+Prints a JSON report and exits with status 1 when the top-1 intent
+agreement on the reference set falls below --min-agreement.
+"""
+
+import argparse
+import json
+import sys
+
+import numpy as np
+
+from src.anchors import DEFAULT_INTENT_ANCHORS
+from src.classifier import IntentClassifier
+from src.embeddings import BACKENDS
+
+# Paraphrases and out-of-scope messages that are not anchors themselves
+EXTRA_REFERENCE_UTTERANCES = [
+    "can't wait for the companies to start coming",
+    "I'd love to land a product role this year",
+    "how many rounds does the first company have",
+    "is there a minimum cgpa cutoff",
+    "what's the stipend for the internship",
+    "should I pick the startup or the big firm",
+    "is higher studies a better option than a job",
+    "I keep failing the technical round",
+    "this year's offers are so bad",
+    "nobody from the placement cell replies",
+    "I signed with the first company that offered",
+    "I'm dropping out of placements to prepare for GATE",
+    "I like football",
+    "Which league is better?",
+    "blah blah random noise",
+    "what time is it",
+]
+
+
+def reference_utterances(intent_anchors=None):
+    """Anchor sentences plus paraphrases, in a stable order."""
+    anchors = DEFAULT_INTENT_ANCHORS if intent_anchors is None else intent_anchors
+    return [s for sentences in anchors.values() for s in sentences] + EXTRA_REFERENCE_UTTERANCES
+
+
+def backend_agreement(
+    backend: str,
+    model_name: str = "sentence-transformers/all-MiniLM-L6-v2",
+    utterances=None,
+    confidence_threshold: float = 0.30,
+):
+    """
+    Compare `backend` against the fp32 torch backend.
+
+    Returns a report dict with the fraction of utterances whose predicted
+    intent (including "unknown") matches, confidence deltas, and the
+    utterances that disagree.
+    """
+    utterances = reference_utterances() if utterances is None else list(utterances)
+
+    # Anchors are re-encoded on both sides so neither reads the other's cache
+    reference = IntentClassifier(
+        model_name, confidence_threshold=confidence_threshold, cache_dir=None
+    )
+    candidate = IntentClassifier(
+        model_name, confidence_threshold=confidence_threshold, cache_dir=None, backend=backend
+    )
+
+    expected = reference.detect_many(utterances)
+    actual = candidate.detect_many(utterances)
+
+    deltas = np.abs(
+        np.array([d.confidence for d in expected])
+        - np.array([d.confidence for d in actual])
+    )
+    mismatches = [
+        {"utterance": u, "fp32": e.intent, backend: a.intent}
+        for u, e, a in zip(utterances, expected, actual)
+        if e.intent != a.intent
+    ]
+
+    return {
+        "backend": backend,
+        "n_utterances": len(utterances),
+        "agreement": round(1.0 - len(mismatches) / len(utterances), 4),
+        "mean_confidence_delta": round(float(deltas.mean()), 4),
+        "max_confidence_delta": round(float(deltas.max()), 4),
+        "mismatches": mismatches,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compare a backend's intents against fp32")
+    parser.add_argument("--backend", choices=BACKENDS, default="int8")
+    parser.add_argument("--model-name", default="sentence-transformers/all-MiniLM-L6-v2")
+    parser.add_argument("--confidence-threshold", type=float, default=0.30)
+    parser.add_argument("--min-agreement", type=float, default=0.98)
+    args = parser.parse_args(argv)
+
+    report = backend_agreement(
+        args.backend,
+        model_name=args.model_name,
+        confidence_threshold=args.confidence_threshold,
+    )
+    print(json.dumps(report, indent=2))
+
+    if report["agreement"] < args.min_agreement:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,144 @@
+import asyncio
+
+
+class MicroBatcher:
+    """
+    Coalesces concurrent update requests into batched encoder calls.
+
+    Callers await submit(); a single background task collects pending
+    utterances until either max_batch_size is reached or max_wait_ms has
+    passed since the first one arrived, encodes them in one call on an
+    executor thread, then applies each result to its session's drift
+    state in arrival order.
+    """
+
+    def __init__(
+        self,
+        detector,
+        max_batch_size: int = 64,
+        max_wait_ms: float = 5.0,
+        executor=None,
+    ):
+        """
+        detector:
+            The IntentDriftDetector whose classifier and sessions are used.
+
+        max_batch_size:
+            Upper bound on utterances per encoder call.
+
+        max_wait_ms:
+            How long the first utterance of a batch may wait for others.
+
+        executor:
+            concurrent.futures executor for the encoder call.
+            None uses the event loop's default executor.
+        """
+        self.detector = detector
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000.0
+        self.executor = executor
+
+        self.loop = asyncio.get_running_loop()
+        self._queue = asyncio.Queue()
+        self._closed = False
+        self._task = self.loop.create_task(self._run())
+
+    # ------------------------------------------------------------------
+
+    async def submit(self, session_id, utterance: str, domain: str = None):
+        """Queue one utterance and wait for its update() result."""
+        if self._closed:
+            raise RuntimeError("MicroBatcher is closed")
+
+        future = self.loop.create_future()
+        enqueued = self.loop.time() if self.detector.metrics is not None else None
+        self._queue.put_nowait((session_id, utterance, domain, future, enqueued))
+        return await future
+
+    # ------------------------------------------------------------------
+
+    async def close(self):
+        """Stop accepting work, finish what is queued, then stop the task."""
+        if self._closed:
+            return
+        self._closed = True
+        self._queue.put_nowait(None)
+        await self._task
+
+    # ------------------------------------------------------------------
+
+    async def _run(self):
+        stopping = False
+
+        while not stopping:
+            item = await self._queue.get()
+            if item is None:
+                break
+
+            batch = [item]
+            deadline = self.loop.time() + self.max_wait
+
+            while len(batch) < self.max_batch_size:
+                timeout = deadline - self.loop.time()
+                try:
+                    if timeout > 0:
+                        item = await asyncio.wait_for(self._queue.get(), timeout)
+                    else:
+                        item = self._queue.get_nowait()
+                except (asyncio.TimeoutError, asyncio.QueueEmpty):
+                    break
+
+                if item is None:
+                    stopping = True
+                    break
+                batch.append(item)
+
+            await self._process(batch)
+
+    # ------------------------------------------------------------------
+
+    async def _process(self, batch):
+        metrics = self.detector.metrics
+        if metrics is not None:
+            now = self.loop.time()
+            for *_, enqueued in batch:
+                metrics.observe("queue_wait_seconds", now - enqueued)
+
+        utterances = [utterance for _, utterance, _, _, _ in batch]
+        domains = [domain for _, _, domain, _, _ in batch]
+
+        try:
+            detections = await self.loop.run_in_executor(
+                self.executor, self.detector._detect_by_domain, utterances, domains
+            )
+        except Exception as exc:
+            for *_, future, _ in batch:
+                if not future.done():
+                    future.set_exception(exc)
+            return
+
+        # A state store does I/O per turn: keep it off the event loop
+        if self.detector.state_store is None:
+            outcomes = self._apply_all(batch, detections)
+        else:
+            outcomes = await self.loop.run_in_executor(
+                self.executor, self._apply_all, batch, detections
+            )
+
+        for (*_, future, _), (result, exc) in zip(batch, outcomes):
+            if future.done():
+                continue
+            if exc is not None:
+                future.set_exception(exc)
+            else:
+                future.set_result(result)
+
+    def _apply_all(self, batch, detections):
+        """Apply detections in batch order -> (result, exception) pairs."""
+        outcomes = []
+        for (session_id, utterance, domain, _, _), detection in zip(batch, detections):
+            try:
+                outcomes.append((self.detector._apply(session_id, utterance, detection, domain), None))
+            except Exception as exc:
+                outcomes.append((None, exc))
+        return outcomes
@@ -0,0 +1,289 @@
+"""
+Reproducible cost benchmarks for IntentDriftDetector.
+
+    python -m src.benchmark --output bench.json
+    python -m src.benchmark --backend int8 --lexical-fast-path
+
+Measures cold start (import, model load, anchor embedding with and
+without the on-disk cache), single-turn update() latency percentiles,
+batch throughput at several batch sizes, and peak RSS. Conversations are
+synthesised from the anchor sentences with a fixed seed, so runs on
+different commits score the same inputs. Output is one JSON document.
+"""
+
+import argparse
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+from src.anchors import DEFAULT_INTENT_ANCHORS
+from src.embeddings import BACKENDS
+
+NOISE_UTTERANCES = [
+    "ok",
+    "thanks",
+    "hmm",
+    "what time is it",
+    "blah blah random noise",
+    "I like football",
+]
+
+FILLERS = ["honestly", "to be fair", "right now", "I guess", "you know", "tbh"]
+
+
+def synthetic_conversations(
+    n_conversations: int,
+    turns_per_conversation: int,
+    seed: int = 0,
+    intent_anchors: dict = None,
+    stay_probability: float = 0.7,
+    noise_probability: float = 0.1,
+):
+    """
+    Yield conversations as lists of utterances.
+
+    Each conversation is a random walk over intents that stays on the
+    current intent with stay_probability. Utterances are anchor sentences
+    with light perturbation (dropped words, fillers, casing), with
+    out-of-scope noise mixed in at noise_probability.
+    """
+    anchors = DEFAULT_INTENT_ANCHORS if intent_anchors is None else intent_anchors
+    intents = list(anchors)
+    rng = random.Random(seed)
+
+    for _ in range(n_conversations):
+        intent = rng.choice(intents)
+        conversation = []
+
+        for _ in range(turns_per_conversation):
+            if rng.random() > stay_probability:
+                intent = rng.choice(intents)
+
+            if rng.random() < noise_probability:
+                conversation.append(rng.choice(NOISE_UTTERANCES))
+                continue
+
+            words = rng.choice(anchors[intent]).split()
+            if len(words) > 3 and rng.random() < 0.3:
+                del words[rng.randrange(len(words))]
+            if rng.random() < 0.3:
+                words.insert(rng.randrange(len(words) + 1), rng.choice(FILLERS))
+            text = " ".join(words)
+            conversation.append(text.capitalize() if rng.random() < 0.5 else text)
+
+        yield conversation
+
+
+def peak_rss_mb():
+    """
+    Peak resident set size of this process so far, in MiB, or None where
+    the resource module is missing (Windows).
+    """
+    try:
+        import resource
+    except ImportError:
+        return None
+
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports KiB, macOS bytes
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def _round(value, digits):
+    return None if value is None else round(value, digits)
+
+
+def _percentiles_ms(samples):
+    samples = np.array(samples) * 1000.0
+    return {
+        "p50_ms": round(float(np.percentile(samples, 50)), 3),
+        "p95_ms": round(float(np.percentile(samples, 95)), 3),
+        "p99_ms": round(float(np.percentile(samples, 99)), 3),
+        "mean_ms": round(float(samples.mean()), 3),
+    }
+
+
+def _git_commit():
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"],
+            stderr=subprocess.DEVNULL,
+            text=True,
+        ).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def _import_seconds():
+    """Time to import src.drift_detector in a fresh interpreter."""
+    repo_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    code = (
+        "import time; t0 = time.perf_counter(); import src.drift_detector; "
+        "print(time.perf_counter() - t0)"
+    )
+    output = subprocess.check_output([sys.executable, "-c", code], cwd=repo_root, text=True)
+    return float(output.strip().splitlines()[-1])
+
+
+def bench_cold_start(detector_kwargs):
+    """Import, model load and anchor embedding times, cold and cached."""
+    from src.drift_detector import IntentDriftDetector
+
+    import_s = _import_seconds()
+
+    with tempfile.TemporaryDirectory() as cache_dir:
+        t0 = time.perf_counter()
+        detector = IntentDriftDetector(cache_dir=cache_dir, **detector_kwargs)
+        uncached_s = time.perf_counter() - t0
+
+        t0 = time.perf_counter()
+        detector.classifier._embed_intent_anchors()
+        cached_anchors_s = time.perf_counter() - t0
+
+        detector.classifier.cache_dir = None
+        t0 = time.perf_counter()
+        detector.classifier._embed_intent_anchors()
+        anchors_s = time.perf_counter() - t0
+
+    return detector, {
+        "import_s": round(import_s, 4),
+        "init_s": round(uncached_s, 4),
+        "model_load_s": round(uncached_s - anchors_s, 4),
+        "anchor_embed_s": round(anchors_s, 4),
+        "anchor_embed_cached_s": round(cached_anchors_s, 4),
+    }
+
+
+def bench_latency(detector, conversations):
+    """Per-turn update() latency, one conversation after another."""
+    samples = []
+    for i, conversation in enumerate(conversations):
+        session_id = f"latency-{i}"
+        for utterance in conversation:
+            t0 = time.perf_counter()
+            detector.update(utterance, session_id=session_id)
+            samples.append(time.perf_counter() - t0)
+        detector.reset(session_id)
+
+    return {"turns": len(samples), **_percentiles_ms(samples)}
+
+
+def bench_throughput(detector, utterances, batch_sizes):
+    """
+    Utterances per second through detect_batch() at each batch size.
+    With an embedding cache, each batch size starts from an empty cache
+    so the figures measure encoding; a second pass over the now-cached
+    utterances is reported as cached_utterances_per_s.
+    """
+    cache = detector.classifier.embedding_cache
+
+    def timed(batches):
+        t0 = time.perf_counter()
+        for batch in batches:
+            detector.detect_batch(batch, batch_size=batch_size)
+        return time.perf_counter() - t0
+
+    results = {}
+    for batch_size in batch_sizes:
+        batches = [
+            utterances[i:i + batch_size] for i in range(0, len(utterances), batch_size)
+        ]
+        if cache is not None:
+            cache.clear()
+        elapsed = timed(batches)
+
+        results[str(batch_size)] = {
+            "utterances": len(utterances),
+            "seconds": round(elapsed, 4),
+            "utterances_per_s": round(len(utterances) / elapsed, 1),
+        }
+        if cache is not None:
+            results[str(batch_size)]["cached_utterances_per_s"] = round(
+                len(utterances) / timed(batches), 1
+            )
+    return results
+
+
+def run(
+    detector_kwargs,
+    n_conversations: int = 20,
+    turns_per_conversation: int = 10,
+    batch_sizes=(1, 8, 32, 128),
+    seed: int = 0,
+):
+    conversations = list(
+        synthetic_conversations(n_conversations, turns_per_conversation, seed=seed)
+    )
+    utterances = [u for conversation in conversations for u in conversation]
+
+    detector, cold_start = bench_cold_start(detector_kwargs)
+
+    # Warm-up so one-off allocations do not land in the first sample
+    detector.detect_batch(utterances[:8])
+
+    report = {
+        "meta": {
+            "commit": _git_commit(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "seed": seed,
+            "detector": detector_kwargs,
+        },
+        "cold_start": cold_start,
+        "latency": bench_latency(detector, conversations),
+        "throughput": bench_throughput(detector, utterances, batch_sizes),
+        "peak_rss_mb": _round(peak_rss_mb(), 1),
+    }
+
+    if detector.classifier.lexical is not None:
+        report["cascade"] = detector.classifier.cascade_stats()
+    if detector.classifier.embedding_cache is not None:
+        report["embedding_cache"] = detector.classifier.embedding_cache.stats()
+
+    return report
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark IntentDriftDetector")
+    parser.add_argument("-o", "--output", default="-", help="JSON report file, or - for stdout")
+    parser.add_argument("--conversations", type=int, default=20)
+    parser.add_argument("--turns", type=int, default=10)
+    parser.add_argument("--batch-sizes", default="1,8,32,128")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--model-name", default="sentence-transformers/all-MiniLM-L6-v2")
+    parser.add_argument("--backend", choices=BACKENDS, default="torch")
+    parser.add_argument("--lexical-fast-path", action="store_true")
+    parser.add_argument("--embedding-cache-size", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    report = run(
+        {
+            "model_name": args.model_name,
+            "backend": args.backend,
+            "lexical_fast_path": args.lexical_fast_path,
+            "embedding_cache_size": args.embedding_cache_size,
+        },
+        n_conversations=args.conversations,
+        turns_per_conversation=args.turns,
+        batch_sizes=[int(b) for b in args.batch_sizes.split(",")],
+        seed=args.seed,
+    )
+
+    text = json.dumps(report, indent=2)
+    if args.output == "-":
+        print(text)
+    else:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,201 @@
+import re
+
+import numpy as np
+
+COMBINE_METHODS = ("max", "mean", "weighted")
+
+# Sentence ends (., !, ? followed by space) and line breaks
+_SENTENCE_RE = re.compile(r"(?<=[.!?])\s+|\s*\n+\s*")
+
+
+class Chunker:
+    """
+    Splits long messages into encoder-sized chunks.
+
+    Sentences are packed greedily into chunks of at most
+    max_chunk_tokens; a sentence longer than that is cut into word
+    windows. At most max_turn_tokens are kept per message: beyond the
+    cap, half the budget goes to the start of the message and the rest
+    to its end, so both the opening and the closing request of a long
+    paste survive.
+    """
+
+    def __init__(self, max_chunk_tokens: int, max_turn_tokens: int = None, tokenizer=None):
+        """
+        max_chunk_tokens:
+            Token budget of one chunk (the encoder's sequence length).
+
+        max_turn_tokens:
+            Hard cap on tokens encoded per message. None means no cap.
+
+        tokenizer:
+            Hugging Face tokenizer used to count tokens. Without one,
+            words are counted instead.
+        """
+        if max_turn_tokens is not None:
+            max_chunk_tokens = min(max_chunk_tokens, max_turn_tokens)
+        if max_chunk_tokens < 1:
+            raise ValueError("max_chunk_tokens must be at least 1")
+
+        self.max_chunk_tokens = max_chunk_tokens
+        self.max_turn_tokens = max_turn_tokens
+        self.tokenizer = tokenizer
+
+    # ------------------------------------------------------------------
+
+    def count_tokens(self, texts):
+        if self.tokenizer is None:
+            return [len(text.split()) for text in texts]
+        encoded = self.tokenizer(list(texts), add_special_tokens=False)
+        return [len(ids) for ids in encoded["input_ids"]]
+
+    def split(self, text: str):
+        """Chunks of text, in order, and the token count of each."""
+        # Every token covers at least one character, so short messages
+        # are known to fit without running the tokenizer
+        if len(text) <= self.max_chunk_tokens:
+            return [text], [max(len(text.split()), 1)]
+
+        sentences = [s for s in _SENTENCE_RE.split(text) if s.strip()]
+        if not sentences:
+            return [text], [1]
+
+        pieces = []
+        for sentence, n_tokens in zip(sentences, self.count_tokens(sentences)):
+            if n_tokens <= self.max_chunk_tokens:
+                pieces.append((sentence, n_tokens))
+            else:
+                pieces.extend(self._windows(sentence))
+
+        # Greedily pack consecutive pieces into chunks
+        chunks, counts = [], []
+        for piece, n_tokens in pieces:
+            if chunks and counts[-1] + n_tokens <= self.max_chunk_tokens:
+                chunks[-1] = f"{chunks[-1]} {piece}"
+                counts[-1] += n_tokens
+            else:
+                chunks.append(piece)
+                counts.append(n_tokens)
+
+        return self._cap(chunks, counts)
+
+    # ------------------------------------------------------------------
+
+    def _windows(self, sentence: str):
+        """Cut an over-long sentence into consecutive word windows."""
+        words = sentence.split()
+        windows = []
+        current, current_tokens = [], 0
+
+        for word, n_tokens in zip(words, self.count_tokens(words)):
+            if current and current_tokens + n_tokens > self.max_chunk_tokens:
+                windows.append((" ".join(current), current_tokens))
+                current, current_tokens = [], 0
+            current.append(word)
+            current_tokens += n_tokens
+
+        if current:
+            windows.append((" ".join(current), current_tokens))
+        return windows
+
+    def _cap(self, chunks, counts):
+        """
+        Keep max_turn_tokens of the message: half from the start, the
+        rest from the end. A chunk that straddles either limit is cut at
+        a word boundary, so the closing request survives even when the
+        cap is no larger than one chunk.
+        """
+        budget = self.max_turn_tokens
+        if budget is None or sum(counts) <= budget:
+            return chunks, counts
+
+        # Head: whole chunks up to half the budget, then a prefix
+        head, head_tokens = [], 0
+        head_budget = budget - budget // 2
+        first = 0
+        while first < len(chunks) and head_tokens + counts[first] <= head_budget:
+            head.append((chunks[first], counts[first]))
+            head_tokens += counts[first]
+            first += 1
+
+        cut_words = 0  # words of chunks[first] already kept by the head
+        if first < len(chunks) and head_tokens < head_budget:
+            words = chunks[first].split()
+            cut_words, n_tokens = self._fit_words(words, head_budget - head_tokens)
+            if cut_words:
+                head.append((" ".join(words[:cut_words]), n_tokens))
+                head_tokens += n_tokens
+
+        # Tail: the remaining budget, whole chunks from the end, then a suffix
+        tail, tail_tokens = [], 0
+        tail_budget = budget - head_tokens
+        last = len(chunks) - 1
+        while last > first and tail_tokens + counts[last] <= tail_budget:
+            tail.append((chunks[last], counts[last]))
+            tail_tokens += counts[last]
+            last -= 1
+
+        if last >= first and tail_tokens < tail_budget:
+            words = chunks[last].split()
+            if last == first:
+                words = words[cut_words:]
+            n_words, n_tokens = self._fit_words(words[::-1], tail_budget - tail_tokens)
+            if n_words:
+                tail.append((" ".join(words[len(words) - n_words:]), n_tokens))
+
+        kept = head + tail[::-1]
+        if not kept:
+            # One word over the whole budget (a URL, hash or base64 blob):
+            # keep its start rather than nothing
+            words = chunks[0].split() or [chunks[0]]
+            kept = [self._truncate(words[0], budget)]
+        return [chunk for chunk, _ in kept], [n for _, n in kept]
+
+    def _truncate(self, text: str, budget: int):
+        """Longest prefix of text within budget tokens: (prefix, n_tokens)."""
+        # Every token covers at least one character
+        text = text[:max(budget, 1)]
+        n_tokens = self.count_tokens([text])[0]
+        while n_tokens > budget and len(text) > 1:
+            text = text[:max(len(text) * budget // n_tokens, 1)]
+            n_tokens = self.count_tokens([text])[0]
+        return text, max(n_tokens, 1)
+
+    def _fit_words(self, words, budget: int):
+        """Leading words that fit in budget tokens: (n_words, n_tokens)."""
+        n_words = n_tokens = 0
+        for count in self.count_tokens(words):
+            if n_tokens + count > budget:
+                break
+            n_words += 1
+            n_tokens += count
+        return n_words, n_tokens
+
+
+def combine_chunks(values, owners, weights, n_groups: int, method: str):
+    """
+    Pool per-chunk rows into one row per message.
+
+    values:  (n_chunks, d) chunk scores or embeddings
+    owners:  (n_chunks,) message index of each chunk
+    weights: (n_chunks,) chunk token counts, used by "weighted"
+    method:  "max", "mean" or "weighted"
+    """
+    owners = np.asarray(owners)
+
+    if method == "max":
+        pooled = np.full((n_groups, values.shape[1]), -np.inf, dtype=values.dtype)
+        np.maximum.at(pooled, owners, values)
+        return pooled
+
+    if method == "mean":
+        weights = np.ones(len(owners), dtype=values.dtype)
+    elif method == "weighted":
+        weights = np.asarray(weights, dtype=values.dtype)
+    else:
+        raise ValueError(f"Unknown combine method {method!r}; expected one of {COMBINE_METHODS}")
+
+    pooled = np.zeros((n_groups, values.shape[1]), dtype=values.dtype)
+    np.add.at(pooled, owners, values * weights[:, None])
+    totals = np.bincount(owners, weights=weights, minlength=n_groups)
+    return pooled / totals[:, None].astype(values.dtype)
@@ -0,0 +1,667 @@
+import threading
+import time
+from collections import Counter
+from typing import NamedTuple
+
+import numpy as np
+
+from src.anchor_cache import (
+    DEFAULT_CACHE_DIR,
+    anchor_cache_key,
+    load_anchor_embeddings,
+    remove_anchor_embeddings,
+    save_anchor_embeddings,
+)
+from src.anchor_index import AnchorIndex
+from src.anchors import DEFAULT_INTENT_ANCHORS, load_intent_anchors
+from src.chunking import COMBINE_METHODS, Chunker, combine_chunks
+from src.embedding_cache import EmbeddingCache
+from src.embeddings import load_sentence_transformer
+
+
+class Detection(NamedTuple):
+    """Intent assigned to one utterance and the stage that decided it."""
+
+    intent: str
+    confidence: float
+    stage: str  # "lexical" or "encoder"
+    # Nearest anchors as (sentence, intent, similarity), k-NN scoring only
+    matches: tuple = None
+    # Encoder stage: similarity to every intent, aligned with labels
+    scores: np.ndarray = None
+    labels: np.ndarray = None
+
+
+class Embedded(NamedTuple):
+    """Encoder output for a list of texts, ready to score (see embed())."""
+
+    vectors: np.ndarray  # (n_rows, dim) float32, one row per text or chunk
+    n_texts: int
+    # With chunking: text index and token count of every row
+    owners: list = None
+    weights: list = None
+
+    def select(self, rows) -> "Embedded":
+        """The same embeddings restricted to the texts at rows, in order."""
+        rows = list(rows)
+        if self.owners is None:
+            return Embedded(self.vectors[rows], len(rows))
+
+        renumber = {text: i for i, text in enumerate(rows)}
+        keep = [c for c, owner in enumerate(self.owners) if owner in renumber]
+        # Stable sort: each text's chunks stay in order
+        keep.sort(key=lambda c: renumber[self.owners[c]])
+        return Embedded(
+            self.vectors[keep],
+            len(rows),
+            [renumber[self.owners[c]] for c in keep],
+            [self.weights[c] for c in keep],
+        )
+
+
+class IntentClassifier:
+    """
+    Stateless utterance -> intent classifier.
+
+    Holds the sentence encoder and the intent anchor matrix. It keeps no
+    conversation state, so one instance can be shared by every session
+    and thread in a process.
+    """
+
+    def __init__(
+        self,
+        model_name: str = "sentence-transformers/all-MiniLM-L6-v2",
+        confidence_threshold: float = 0.30,
+        intent_anchors: dict = None,
+        model_revision: str = None,
+        cache_dir: str = DEFAULT_CACHE_DIR,
+        backend: str = "torch",
+        lexical_fast_path: bool = False,
+        lexical_min_score: float = 1.0,
+        lexical_min_margin: float = 1.0,
+        metrics=None,
+        anchors_path: str = None,
+        scoring: str = "centroid",
+        knn_k: int = 5,
+        embedding_cache_size: int = 0,
+        long_input: str = None,
+        max_turn_tokens: int = 512,
+        model=None,
+        projection=None,
+    ):
+        """
+        confidence_threshold:
+            Minimum similarity required to assign an intent.
+
+        intent_anchors:
+            Mapping of intent label -> anchor sentences.
+            Defaults to the placement-season set in src.anchors.
+
+        model_revision:
+            Model revision (branch, tag or commit) to load; part of the
+            anchor cache key.
+
+        cache_dir:
+            Directory for the on-disk anchor embedding cache.
+            None disables the cache.
+
+        backend:
+            Inference backend: "torch" (fp32), "int8" (dynamically
+            quantized Linear layers) or "onnx" (onnxruntime).
+            See src.backend_check for agreement with fp32.
+
+        lexical_fast_path:
+            Try a TF-IDF n-gram model (src.lexical) before the encoder and
+            accept its answer for exact anchor repeats, or when its score
+            is at least lexical_min_score and beats the runner-up intent
+            by lexical_min_margin. Everything else goes to the encoder.
+            The defaults accept exact repeats only: n-gram scores do not
+            separate paraphrases from out-of-scope input ("what is the
+            weather" scores 0.48 for information), so lower them only
+            after checking them on real traffic.
+            Lexical decisions report the lexical score as confidence.
+
+        metrics:
+            Optional MetricsSink (src.metrics) receiving per-stage timings
+            and batch sizes. None disables instrumentation.
+
+        anchors_path:
+            JSON file of {intent: [sentences]} to load instead of
+            intent_anchors (see src.anchors.load_intent_anchors).
+
+        scoring:
+            "centroid" compares utterances with one mean vector per
+            intent. "knn" keeps every anchor vector in an approximate
+            index (src.ann) and lets the knn_k nearest anchors vote,
+            weighted by similarity; confidence is the best matching
+            anchor's similarity and the matches are returned.
+
+        embedding_cache_size:
+            Keep up to this many utterance embeddings in an LRU cache
+            (src.embedding_cache) so repeated messages skip the encoder.
+            0 disables the cache.
+
+        long_input:
+            None encodes each message whole, truncated by the encoder at
+            its sequence length. "max", "mean" or "weighted" split long
+            messages into sentence/window chunks (src.chunking), encode
+            all chunks in one batch, and combine the chunks' intent
+            scores by maximum, mean or token-length-weighted mean. With
+            knn scoring, chunk embeddings are pooled before the search.
+
+        max_turn_tokens:
+            With long_input, the most tokens encoded for one message;
+            half the budget keeps the start of the message, the rest its end.
+
+        model:
+            An already loaded SentenceTransformer to use instead of
+            loading model_name (which must still name it, for the anchor
+            cache key). Lets several anchor sets share one encoder.
+
+        projection:
+            Optional EmbeddingProjection (src.compression). Utterance
+            vectors (and the embedding cache) and the anchor scoring
+            matrix are kept in its reduced dimension and dtype; anchor
+            embeddings on disk stay full precision.
+        """
+
+        self.model_name = model_name
+        self.model_revision = model_revision
+        self.cache_dir = cache_dir
+        self.confidence_threshold = confidence_threshold
+        self.backend = backend
+        if model is None:
+            model = load_sentence_transformer(
+                model_name, backend=backend, revision=model_revision
+            )
+        self.model = model
+
+        if anchors_path is not None:
+            intent_anchors = load_intent_anchors(anchors_path)
+        elif intent_anchors is None:
+            intent_anchors = DEFAULT_INTENT_ANCHORS
+
+        if scoring not in ("centroid", "knn"):
+            raise ValueError(f"Unknown scoring {scoring!r}; expected 'centroid' or 'knn'")
+        self.scoring = scoring
+        self.knn_k = knn_k
+
+        if long_input is not None and long_input not in COMBINE_METHODS:
+            raise ValueError(
+                f"Unknown long_input {long_input!r}; expected one of {COMBINE_METHODS}"
+            )
+        self.long_input = long_input
+        self.chunker = None
+        if long_input is not None:
+            # Leave room for the [CLS] / [SEP] tokens the encoder adds
+            seq_length = getattr(self.model, "max_seq_length", None) or 256
+            self.chunker = Chunker(
+                seq_length - 2,
+                max_turn_tokens,
+                tokenizer=getattr(self.model, "tokenizer", None),
+            )
+
+        # Precompute anchor embeddings
+        self.projection = projection
+        self._lexical_fast_path = lexical_fast_path
+        self._index = self._embed_intent_anchors(intent_anchors)
+        self._update_lock = threading.Lock()
+
+        self.lexical_min_score = lexical_min_score
+        self.lexical_min_margin = lexical_min_margin
+        self.metrics = metrics
+        self.embedding_cache = (
+            EmbeddingCache(embedding_cache_size) if embedding_cache_size else None
+        )
+
+        # Utterances decided per stage, for measuring encoder traffic saved
+        self.stage_counts = Counter()
+        self._stats_lock = threading.Lock()
+
+    # ------------------------------------------------------------------
+    # Views of the current anchor snapshot
+
+    @property
+    def intent_anchors(self):
+        return self._index.anchors
+
+    @property
+    def intent_labels(self):
+        return self._index.labels
+
+    @property
+    def intent_matrix(self):
+        return self._index.matrix
+
+    @property
+    def lexical(self):
+        return self._index.lexical
+
+    # ------------------------------------------------------------------
+
+    def _embed_intent_anchors(self, intent_anchors: dict = None) -> AnchorIndex:
+        """
+        Build an AnchorIndex for intent_anchors (default: the current set):
+        one embedding per anchor sentence, averaged per intent into an
+        L2-normalized (n_intents, dim) centroid matrix.
+        """
+        if intent_anchors is None:
+            intent_anchors = self.intent_anchors
+
+        return AnchorIndex.from_embeddings(
+            intent_anchors,
+            self._load_anchor_embeddings(intent_anchors),
+            lexical=self._lexical_fast_path,
+            knn=self.scoring == "knn",
+            projection=self.projection,
+        )
+
+    # ------------------------------------------------------------------
+
+    def _load_anchor_embeddings(self, intent_anchors: dict):
+        """
+        Embeddings of every anchor sentence, in intent order.
+        Served from the on-disk cache when possible, otherwise encoded
+        in one batch and written back to the cache.
+        """
+        anchors = [
+            sentence
+            for sentences in intent_anchors.values()
+            for sentence in sentences
+        ]
+
+        if self.cache_dir is None:
+            return self.encode(anchors)
+
+        key = self._cache_key(intent_anchors)
+        anchor_embs = load_anchor_embeddings(self.cache_dir, key, len(anchors))
+
+        if anchor_embs is None:
+            anchor_embs = self.encode(anchors)
+            save_anchor_embeddings(self.cache_dir, key, anchor_embs)
+
+        return anchor_embs
+
+    def _cache_key(self, intent_anchors: dict) -> str:
+        return anchor_cache_key(
+            self.model_name,
+            self.model_revision,
+            {intent: list(sentences) for intent, sentences in intent_anchors.items()},
+            self.backend,
+        )
+
+    # ------------------------------------------------------------------
+    # Runtime anchor management. Writers are serialized; each change
+    # encodes only new sentences and publishes a fresh AnchorIndex.
+
+    def add_anchors(self, intent: str, sentences) -> int:
+        """
+        Add anchor sentences to an intent, creating the intent if needed.
+        Only sentences not already anchoring it are encoded.
+        Returns the number of sentences added.
+        """
+        with self._update_lock:
+            index = self._index
+            existing = set(index.anchors.get(intent, ()))
+            new = [s for s in dict.fromkeys(sentences) if s not in existing]
+            if not new:
+                return 0
+
+            self._publish(index.with_added(intent, new, self.encode(new)))
+            return len(new)
+
+    def remove_anchors(self, intent: str, sentences) -> int:
+        """
+        Remove anchor sentences from an intent; an intent left without
+        anchors is removed. Returns the number of sentences removed.
+        """
+        with self._update_lock:
+            index = self._index
+            if intent not in index.anchors:
+                raise KeyError(f"unknown intent {intent!r}")
+
+            removed = set(sentences) & set(index.anchors[intent])
+            if not removed:
+                return 0
+
+            self._publish(index.with_removed(intent, removed))
+            return len(removed)
+
+    def remove_intent(self, intent: str):
+        """Remove an intent and all of its anchors."""
+        with self._update_lock:
+            index = self._index
+            if intent not in index.anchors:
+                raise KeyError(f"unknown intent {intent!r}")
+
+            self._publish(index.with_removed(intent))
+
+    def reload_anchors(self, intent_anchors: dict) -> int:
+        """
+        Replace the whole anchor set (e.g. after editing the anchors file).
+        Sentences already embedded are reused; only new ones are encoded.
+        Returns the number of sentences encoded.
+        """
+        with self._update_lock:
+            known = self._index.sentence_vectors()
+            new = [
+                s
+                for sentences in intent_anchors.values()
+                for s in sentences
+                if s not in known
+            ]
+            if new:
+                known.update(zip(new, self.encode(new)))
+
+            anchor_embs = np.vstack([
+                known[s] for sentences in intent_anchors.values() for s in sentences
+            ])
+            self._publish(
+                AnchorIndex.from_embeddings(
+                    intent_anchors,
+                    anchor_embs,
+                    lexical=self._lexical_fast_path,
+                    knn=self.scoring == "knn",
+                    projection=self.projection,
+                )
+            )
+            return len(new)
+
+    def _publish(self, index: AnchorIndex):
+        """
+        Swap in a new snapshot and persist it for future cold starts,
+        replacing the superseded anchor set's cache entry.
+        """
+        previous, self._index = self._index, index
+        if self.cache_dir is None:
+            return
+
+        key = self._cache_key(index.anchors)
+        old_key = self._cache_key(previous.anchors)
+        if save_anchor_embeddings(self.cache_dir, key, index.flat_embeddings()) and old_key != key:
+            remove_anchor_embeddings(self.cache_dir, old_key)
+
+    # ------------------------------------------------------------------
+
+    def encode(self, utterances, batch_size: int = 32):
+        """
+        Encode one utterance (-> (dim,)) or a list (-> (n, dim))
+        into L2-normalized float32 vectors.
+        """
+        return self.model.encode(
+            utterances,
+            batch_size=batch_size,
+            convert_to_numpy=True,
+            normalize_embeddings=True,
+        )
+
+    def encode_compact(self, utterances, batch_size: int = 32):
+        """encode(), then reduced by the projection if one is set."""
+        vectors = self.encode(utterances, batch_size=batch_size)
+        if self.projection is not None:
+            vectors = self.projection.apply(vectors)
+        return vectors
+
+    def encode_cached(self, utterances, batch_size: int = 32):
+        """
+        encode_compact() a list of utterances through the embedding
+        cache: only distinct cache misses reach the encoder.
+        Returns (n, dim).
+        """
+        cache = self.embedding_cache
+        if cache is None:
+            return self.encode_compact(utterances, batch_size=batch_size)
+
+        keys, vectors = cache.get_many(utterances)
+
+        missing = {}  # key -> first utterance with that key
+        for key, utterance, vector in zip(keys, utterances, vectors):
+            if vector is None:
+                missing.setdefault(key, utterance)
+
+        if self.metrics is not None:
+            misses = sum(v is None for v in vectors)
+            self.metrics.increment("embedding_cache_hits_total", len(vectors) - misses)
+            self.metrics.increment("embedding_cache_misses_total", misses)
+
+        if missing:
+            encoded = self.encode_compact(list(missing.values()), batch_size=batch_size)
+            cache.put_many(missing, encoded)
+            fresh = dict(zip(missing, encoded))
+            vectors = [fresh[k] if v is None else v for k, v in zip(keys, vectors)]
+
+        return np.vstack(vectors)
+
+    # ------------------------------------------------------------------
+
+    def score(self, utter_embs):
+        """
+        Cosine similarity against every intent in one matrix product:
+        (dim,) -> (n_intents,) or (n, dim) -> (n, n_intents).
+        Full-precision encode() output is projected first.
+        """
+        matrix = self._index.scoring_matrix
+        if self.projection is not None and np.shape(utter_embs)[-1] != matrix.shape[1]:
+            utter_embs = self.projection.apply(utter_embs)
+        return np.asarray(utter_embs, dtype=np.float32) @ matrix.T
+
+    # ------------------------------------------------------------------
+
+    def detect(self, utterance: str) -> Detection:
+        """
+        Assigns an intent label to a single utterance
+        based on similarity to intent anchors.
+        """
+        return self.detect_many([utterance])[0]
+
+    # ------------------------------------------------------------------
+
+    def detect_many(self, utterances, batch_size: int = 32, embedded: Embedded = None):
+        """
+        Assigns an intent label to every utterance in the list.
+        Utterances not settled by the lexical fast path are encoded
+        together in a single model call, or taken from `embedded` (embed()
+        output for all utterances, with a matching embedding_key).
+        Returns one Detection per utterance, in input order.
+        """
+        # One snapshot for the whole call, even if anchors are swapped meanwhile
+        index = self._index
+        metrics = self.metrics
+        detections = [None] * len(utterances)
+
+        if index.lexical is not None:
+            if metrics is not None:
+                t0 = time.perf_counter()
+
+            for i, utterance in enumerate(utterances):
+                intent, score, margin = index.lexical.predict(utterance)
+                if (
+                    intent is not None
+                    and score >= self.lexical_min_score
+                    and margin >= self.lexical_min_margin
+                ):
+                    detections[i] = Detection(intent, score, "lexical")
+
+            if metrics is not None:
+                metrics.observe("lexical_seconds", time.perf_counter() - t0)
+
+        pending = [i for i, d in enumerate(detections) if d is None]
+
+        if pending:
+            if embedded is None:
+                embedded = self.embed([utterances[i] for i in pending], batch_size)
+            elif len(pending) < len(utterances):
+                embedded = embedded.select(pending)
+            best, best_scores, matches, scores = self._score(index, embedded)
+
+            intents = np.where(
+                best_scores < self.confidence_threshold,
+                "unknown",
+                index.labels[best],
+            )
+
+            for i, intent, score, match, row in zip(
+                pending, intents.tolist(), best_scores.tolist(), matches, scores
+            ):
+                detections[i] = Detection(intent, score, "encoder", match, row, index.labels)
+
+        with self._stats_lock:
+            self.stage_counts["encoder"] += len(pending)
+            self.stage_counts["lexical"] += len(utterances) - len(pending)
+
+        return detections
+
+    # ------------------------------------------------------------------
+
+    def rank_intents(self, utterances, batch_size: int = 32):
+        """
+        Encoder-stage ranking of every utterance, before thresholding.
+        Returns (labels, best intent row per utterance, its confidence).
+        Lets offline evaluation sweep thresholds over a single encoding.
+        """
+        index = self._index
+        best, best_scores, _, _ = self._rank(index, list(utterances), batch_size)
+        return index.labels, best, best_scores
+
+    def _rank(self, index: AnchorIndex, texts, batch_size: int):
+        """
+        Encode texts and score them against index.
+        Returns (best intent rows, confidences, per-text k-NN matches or
+        None, (n, n_intents) scores).
+        """
+        return self._score(index, self.embed(texts, batch_size=batch_size))
+
+    def embed(self, texts, batch_size: int = 32) -> Embedded:
+        """
+        Encoder half of scoring: compact float32 vectors of texts (of
+        their chunks, with long_input). The result can be scored by any
+        classifier sharing this model, projection and chunking (see
+        embedding_key), e.g. every domain of a detector.
+        """
+        metrics = self.metrics
+        if metrics is not None:
+            metrics.observe("batch_size", len(texts))
+            t0 = time.perf_counter()
+
+        owners = weights = None
+        if self.chunker is None:
+            vectors = self.encode_cached(texts, batch_size=batch_size)
+        else:
+            chunks, owners, weights = self._split_long(texts)
+            vectors = self.encode_cached(chunks, batch_size=batch_size)
+            # Pool unless every text is exactly its own single chunk
+            if owners == list(range(len(texts))):
+                owners = weights = None
+
+        if metrics is not None:
+            metrics.observe("encode_seconds", time.perf_counter() - t0)
+
+        # Compact vectors may be stored as float16; score in float32
+        vectors = np.asarray(vectors, dtype=np.float32)
+        return Embedded(vectors, len(texts), owners, weights)
+
+    @property
+    def embedding_key(self):
+        """Equal keys mean embed() output is interchangeable."""
+        chunking = None
+        if self.chunker is not None:
+            chunking = (self.chunker.max_chunk_tokens, self.chunker.max_turn_tokens)
+        return (id(self.model), id(self.projection), chunking)
+
+    def _score(self, index: AnchorIndex, embedded: Embedded):
+        """Scoring half of _rank() for already embedded texts."""
+        metrics = self.metrics
+        if metrics is not None:
+            t0 = time.perf_counter()
+
+        vectors, n_texts = embedded.vectors, embedded.n_texts
+        chunked = None
+        if embedded.owners is not None:
+            chunked = (embedded.owners, embedded.weights)
+
+        if index.ann is not None:
+            if chunked is not None:
+                vectors = combine_chunks(vectors, *chunked, n_texts, "weighted")
+                vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+            best, best_scores, matches, scores = self._knn_scores(index, vectors)
+        else:
+            scores = vectors @ index.scoring_matrix.T
+            if chunked is not None:
+                scores = combine_chunks(scores, *chunked, n_texts, self.long_input)
+            best = scores.argmax(axis=1)
+            best_scores = scores[np.arange(len(best)), best]
+            matches = [None] * n_texts
+
+        if metrics is not None:
+            metrics.observe("score_seconds", time.perf_counter() - t0)
+
+        return best, best_scores, matches, scores
+
+    # ------------------------------------------------------------------
+
+    def _split_long(self, texts):
+        """
+        Chunks of every text, flattened, with the index of the text each
+        chunk came from and its token count.
+        """
+        chunks, owners, weights = [], [], []
+        for i, text in enumerate(texts):
+            text_chunks, counts = self.chunker.split(text)
+            chunks.extend(text_chunks)
+            owners.extend([i] * len(text_chunks))
+            weights.extend(counts)
+        return chunks, owners, weights
+
+    # ------------------------------------------------------------------
+
+    def _knn_scores(self, index: AnchorIndex, utter_embs):
+        """
+        Nearest-anchor voting. Each of the k nearest anchors adds its
+        similarity to its intent's vote; the winner's confidence is its
+        best single anchor similarity.
+        Returns (best intent rows, confidences, per-utterance matches,
+        per-intent best similarity among the neighbours).
+        """
+        ids, sims = index.ann.search(utter_embs, self.knn_k)
+        valid = np.isfinite(sims)
+        intent_rows = index.anchor_intents[ids]
+
+        votes = np.zeros((len(ids), len(index.labels)), dtype=np.float32)
+        rows = np.broadcast_to(np.arange(len(ids))[:, None], ids.shape)
+        np.add.at(votes, (rows[valid], intent_rows[valid]), sims[valid])
+
+        best = votes.argmax(axis=1)
+        in_best = valid & (intent_rows == best[:, None])
+        confidences = np.where(in_best, sims, -np.inf).max(axis=1)
+
+        intent_sims = np.zeros_like(votes)
+        np.maximum.at(intent_sims, (rows[valid], intent_rows[valid]), sims[valid])
+
+        matches = [
+            tuple(
+                (index.anchor_sentences[a], str(index.labels[r]), float(s))
+                for a, r, s, v in zip(id_row, intent_row, sim_row, valid_row)
+                if v
+            )
+            for id_row, intent_row, sim_row, valid_row in zip(ids, intent_rows, sims, valid)
+        ]
+
+        return best, confidences, matches, intent_sims
+
+    # ------------------------------------------------------------------
+
+    def cascade_stats(self):
+        """
+        Utterances decided by each stage so far, and the fraction that
+        never reached the encoder.
+        """
+        with self._stats_lock:
+            lexical = self.stage_counts["lexical"]
+            encoder = self.stage_counts["encoder"]
+
+        total = lexical + encoder
+        return {
+            "lexical": lexical,
+            "encoder": encoder,
+            "lexical_fraction": lexical / total if total else 0.0,
+        }
@@ -0,0 +1,217 @@
+"""
+Reduced-dimension, reduced-precision embedding storage.
+
+    python -m src.compression samples.txt --dim 128 --dtype float16 \\
+        -o projection.npz
+
+Fits a projection on the anchor sentences plus a sample of real
+utterances (one per line), saves it, and prints the top-1 intent
+agreement of the compact vectors against full precision on the
+held-out part of the sample.
+Load it with EmbeddingProjection.load() and pass it to the classifier
+(projection=), or start the server with --projection projection.npz.
+"""
+
+import argparse
+import json
+import sys
+
+import numpy as np
+
+from src.embeddings import BACKENDS
+
+STORAGE_DTYPES = ("float16", "float32")
+
+
+class EmbeddingProjection:
+    """
+    Linear map from encoder space to `dim` dimensions, re-normalized and
+    stored as `dtype`.
+
+    The basis is the top right-singular vectors of the (uncentered) fit
+    embeddings, i.e. the rank-`dim` subspace that best preserves their
+    dot products, so cosine scores stay on the full-precision scale and
+    confidence thresholds carry over. dim=None keeps every dimension and
+    only changes the storage dtype.
+
+    float16 is a storage format: NumPy has no half-precision matrix
+    product, so vectors are widened to float32 just before scoring.
+    """
+
+    def __init__(self, components=None, dtype: str = "float16"):
+        """
+        components:
+            (dim, encoder_dim) orthonormal rows, or None for no projection.
+
+        dtype:
+            "float16" or "float32" storage of projected vectors.
+        """
+        if dtype not in STORAGE_DTYPES:
+            raise ValueError(f"Unknown dtype {dtype!r}; expected one of {STORAGE_DTYPES}")
+
+        self.components = None
+        if components is not None:
+            self.components = np.ascontiguousarray(components, dtype=np.float32)
+        self.dtype = np.dtype(dtype)
+
+    # ------------------------------------------------------------------
+
+    @classmethod
+    def fit(cls, embeddings, dim: int = None, dtype: str = "float16"):
+        """
+        Fit on (n, encoder_dim) embeddings. dim must not exceed n or the
+        encoder dimension.
+        """
+        if dim is None:
+            return cls(None, dtype)
+
+        embeddings = np.asarray(embeddings, dtype=np.float32)
+        n, encoder_dim = embeddings.shape
+        if not 0 < dim <= min(n, encoder_dim):
+            raise ValueError(
+                f"dim must be between 1 and {min(n, encoder_dim)} "
+                f"({n} fit vectors of dimension {encoder_dim})"
+            )
+
+        _, _, vt = np.linalg.svd(embeddings, full_matrices=False)
+        return cls(vt[:dim], dtype)
+
+    @classmethod
+    def load(cls, path: str):
+        with np.load(path, allow_pickle=False) as data:
+            components = data["components"] if data["components"].size else None
+            return cls(components, str(data["dtype"]))
+
+    def save(self, path: str):
+        components = self.components if self.components is not None else np.zeros((0, 0))
+        with open(path, "wb") as f:
+            np.savez(f, components=components, dtype=np.array(self.dtype.name))
+
+    # ------------------------------------------------------------------
+
+    @property
+    def dim(self):
+        """Output dimension, or None when every dimension is kept."""
+        return None if self.components is None else len(self.components)
+
+    def apply(self, vectors):
+        """
+        (n, encoder_dim) or (encoder_dim,) embeddings -> L2-normalized
+        compact vectors in the storage dtype.
+        """
+        vectors = np.asarray(vectors, dtype=np.float32)
+        if self.components is not None:
+            vectors = vectors @ self.components.T
+            norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+            vectors = vectors / np.maximum(norms, 1e-12)
+        return vectors.astype(self.dtype)
+
+    def bytes_per_vector(self, encoder_dim: int) -> int:
+        return (self.dim or encoder_dim) * self.dtype.itemsize
+
+
+# ----------------------------------------------------------------------
+
+
+def fit_projection(classifier, samples=None, dim: int = None, dtype: str = "float16"):
+    """
+    Fit an EmbeddingProjection on the classifier's anchor embeddings
+    plus `samples`, full-precision embeddings of real traffic.
+    """
+    fit_on = classifier._index.flat_embeddings()
+    if samples is not None and len(samples):
+        fit_on = np.vstack([fit_on, samples])
+    return EmbeddingProjection.fit(fit_on, dim, dtype)
+
+
+def agreement_report(classifier, projection: EmbeddingProjection, embeddings):
+    """
+    How much compact storage changes centroid scoring of `embeddings`
+    (full-precision utterance vectors) against the classifier's anchors:
+    top-1 intent agreement, decision agreement after the confidence
+    threshold, score error, and storage per vector.
+    """
+    embeddings = np.asarray(embeddings, dtype=np.float32)
+    index = classifier._index
+    centroids = index.centroids()
+
+    full = embeddings @ centroids.T
+    compact = (
+        projection.apply(embeddings).astype(np.float32)
+        @ projection.apply(centroids).astype(np.float32).T
+    )
+
+    rows = np.arange(len(embeddings))
+    full_best, compact_best = full.argmax(axis=1), compact.argmax(axis=1)
+    threshold = classifier.confidence_threshold
+    full_decision = np.where(full[rows, full_best] < threshold, -1, full_best)
+    compact_decision = np.where(compact[rows, compact_best] < threshold, -1, compact_best)
+    error = np.abs(compact - full)
+
+    encoder_dim = embeddings.shape[1]
+    full_bytes = encoder_dim * np.dtype(np.float32).itemsize
+    compact_bytes = projection.bytes_per_vector(encoder_dim)
+
+    n = max(len(embeddings), 1)
+    return {
+        "sentences": len(embeddings),
+        "dim": projection.dim or encoder_dim,
+        "dtype": projection.dtype.name,
+        "top1_agreement": round(float((full_best == compact_best).sum()) / n, 4),
+        "decision_agreement": round(float((full_decision == compact_decision).sum()) / n, 4),
+        "max_score_error": round(float(error.max()), 5) if error.size else 0.0,
+        "mean_score_error": round(float(error.mean()), 5) if error.size else 0.0,
+        "bytes_per_vector": compact_bytes,
+        "full_bytes_per_vector": full_bytes,
+        "compression_ratio": round(full_bytes / compact_bytes, 2),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Fit a compact embedding projection")
+    parser.add_argument("samples", help="sample utterances, one per line, or - for stdin")
+    parser.add_argument("-o", "--output", help=".npz file to save the projection to")
+    parser.add_argument("--dim", type=int, help="projected dimension (default: keep all)")
+    parser.add_argument("--dtype", choices=STORAGE_DTYPES, default="float16")
+    parser.add_argument("--holdout", type=float, default=0.2,
+                        help="fraction of samples kept out of the fit for the report")
+    parser.add_argument("--batch-size", type=int, default=64)
+    parser.add_argument("--model-name", default="sentence-transformers/all-MiniLM-L6-v2")
+    parser.add_argument("--backend", choices=BACKENDS, default="torch")
+    parser.add_argument("--anchors", help="JSON anchors file replacing the built-in anchors")
+    args = parser.parse_args(argv)
+
+    from src.classifier import IntentClassifier
+
+    if args.samples == "-":
+        sentences = [line.strip() for line in sys.stdin if line.strip()]
+    else:
+        with open(args.samples, encoding="utf-8") as f:
+            sentences = [line.strip() for line in f if line.strip()]
+
+    classifier = IntentClassifier(
+        args.model_name, backend=args.backend, anchors_path=args.anchors
+    )
+    if not sentences:
+        parser.error("no sample utterances")
+    samples = classifier.encode(sentences, batch_size=args.batch_size)
+
+    # Every k-th sample is held out, so both parts span the whole file
+    held_out = np.zeros(len(samples), dtype=bool)
+    if args.holdout > 0:
+        held_out[::max(int(round(1 / args.holdout)), 1)] = True
+
+    try:
+        projection = fit_projection(classifier, samples[~held_out], args.dim, args.dtype)
+    except ValueError as exc:
+        parser.error(str(exc))
+
+    if args.output:
+        projection.save(args.output)
+
+    evaluated = samples[held_out] if held_out.any() else samples
+    print(json.dumps(agreement_report(classifier, projection, evaluated), indent=2))
+
+
+if __name__ == "__main__":
+    main()
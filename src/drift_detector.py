@@ -1,11 +1,36 @@
+import asyncio
+import contextlib
+import threading
+import time
+from concurrent.futures import Future
+from typing import NamedTuple
+
 import numpy as np
-from sentence_transformers import SentenceTransformer, util
+
+from src.anchor_cache import DEFAULT_CACHE_DIR
+from src.batching import MicroBatcher
+from src.classifier import Detection, IntentClassifier
+from src.session_store import SessionStore
+from src.smoothing import ScoreSmoother
+from src.state import HISTORY_SIZE, NO_INTENT, UNKNOWN, ConversationState, IntentVocabulary
+from src.state_store import StateStore, pack_snapshot, unpack_snapshot
+
+
+class Domain(NamedTuple):
+    """A named anchor set and its drift settings."""
+
+    classifier: IntentClassifier
+    drift_persistence: int = None  # None: the detector's own
 
 
 class IntentDriftDetector:
     """
     Detects INTENT drift (not topic drift) by tracking functional intent states
     over a sequence of user utterances.
+
+    The model and anchors live in a shared, stateless IntentClassifier.
+    Drift state is kept per conversation: a default conversation for
+    single-user scripts, plus any number of sessions keyed by session_id.
     """
 
     def __init__(
@@ -13,6 +38,31 @@ class IntentDriftDetector:
         model_name: str = "sentence-transformers/all-MiniLM-L6-v2",
         drift_persistence: int = 1,
         confidence_threshold: float = 0.30,
+        model_revision: str = None,
+        cache_dir: str = DEFAULT_CACHE_DIR,
+        classifier: IntentClassifier = None,
+        max_sessions: int = 10000,
+        session_ttl: float = 3600.0,
+        max_batch_size: int = 64,
+        max_batch_wait_ms: float = 5.0,
+        backend: str = "torch",
+        lexical_fast_path: bool = False,
+        metrics=None,
+        background: bool = False,
+        anchors_path: str = None,
+        scoring: str = "centroid",
+        history_size: int = HISTORY_SIZE,
+        state_store: StateStore = None,
+        embedding_cache_size: int = 0,
+        long_input: str = None,
+        max_turn_tokens: int = 512,
+        smoothing: str = None,
+        smoothing_alpha: float = 0.5,
+        smoothing_window: int = 4,
+        hysteresis: float = 0.05,
+        domains: dict = None,
+        analytics=None,
+        projection=None,
     ):
         """
         drift_persistence:
@@ -21,380 +71,820 @@ class IntentDriftDetector:
 
         confidence_threshold:
             Minimum similarity required to assign an intent.
+
+        model_revision:
+            Model revision (branch, tag or commit) to load; part of the
+            anchor cache key.
+
+        cache_dir:
+            Directory for the on-disk anchor embedding cache.
+            None disables the cache.
+
+        classifier:
+            An existing IntentClassifier to share instead of loading a
+            new model (model_name, confidence_threshold, model_revision
+            cache_dir, backend, lexical_fast_path, anchors_path, scoring,
+            embedding_cache_size, long_input and max_turn_tokens are then
+            ignored).
+
+        max_sessions / session_ttl:
+            Bounds for the per-session state store (LRU size cap and
+            idle expiry in seconds).
+
+        max_batch_size / max_batch_wait_ms:
+            Micro-batching limits for aupdate(): the largest encoder
+            batch, and how long a request may wait for others to join it.
+
+        backend:
+            Encoder inference backend: "torch", "int8" or "onnx".
+
+        lexical_fast_path:
+            Let a cheap n-gram model settle high-margin utterances before
+            the encoder runs. Results report the deciding "stage".
+
+        metrics:
+            Optional MetricsSink (src.metrics) for stage timings and
+            turn/unknown/drift/candidate-reset counters. A classifier
+            created here reports encoder timings to the same sink.
+            None disables instrumentation.
+
+        background:
+            Return immediately and load + warm up the model on a
+            background thread. Calls that need the model wait for it;
+            ready() / health() report progress without blocking.
+
+        anchors_path:
+            JSON file of {intent: [sentences]} replacing the built-in
+            anchors. Anchors can be changed at runtime through
+            classifier.add_anchors / remove_anchors / reload_anchors.
+
+        scoring:
+            "centroid" (one mean vector per intent) or "knn" (vote of
+            the nearest anchor sentences, reported in "matched_anchors").
+
+        history_size:
+            Recent turns kept per conversation (ring buffer); older turns
+            only survive in the per-conversation transition counts.
+
+        state_store:
+            Optional StateStore (src.state_store) holding session state
+            instead of this process's memory. Each session turn loads
+            the snapshot and saves it back, so workers sharing a store
+            can serve any turn. Concurrent turns of one session on
+            different workers are last-write-wins.
+
+        embedding_cache_size:
+            Size of the classifier's LRU cache of utterance embeddings;
+            repeated messages then skip the encoder. 0 disables it.
+
+        long_input / max_turn_tokens:
+            Chunk long messages and combine chunk scores ("max", "mean"
+            or "weighted"), encoding at most max_turn_tokens per message.
+            None (default) encodes messages whole.
+
+        smoothing:
+            None decides drift from each turn's label alone. "ewma" or
+            "window" decide it from a running per-conversation score
+            vector over intents (src.smoothing): the EWMA with weight
+            smoothing_alpha, or the mean of the last smoothing_window
+            turns. drift_persistence still applies on top.
+
+        hysteresis:
+            With smoothing, how far the smoothed leader must score above
+            the current intent before it counts as a new intent.
+
+        domains:
+            Named anchor sets to register on the shared encoder before
+            the detector reports ready: name -> register_domain()
+            keyword arguments. More can be added with register_domain().
+
+        analytics:
+            Optional DriftAggregator (src.analytics) fed every update()
+            result, for fleet-wide intent-flow rollups.
+
+        projection:
+            Optional EmbeddingProjection (src.compression): score and
+            cache utterances in a reduced dimension and/or float16.
         """
 
-        self.model = SentenceTransformer(model_name)
+        # Intent label <-> code mapping shared by every conversation state
+        self.vocabulary = IntentVocabulary()
+        self.domains = {}
+        self._domain_configs = dict(domains or {})
+        self._classifier_future = Future()
+
+        if classifier is not None:
+            self._set_classifier(classifier)
+        else:
+            classifier_kwargs = dict(
+                model_name=model_name,
+                confidence_threshold=confidence_threshold,
+                model_revision=model_revision,
+                cache_dir=cache_dir,
+                backend=backend,
+                lexical_fast_path=lexical_fast_path,
+                metrics=metrics,
+                anchors_path=anchors_path,
+                scoring=scoring,
+                embedding_cache_size=embedding_cache_size,
+                long_input=long_input,
+                max_turn_tokens=max_turn_tokens,
+                projection=projection,
+            )
+            if background:
+                threading.Thread(
+                    target=self._load_classifier,
+                    args=(classifier_kwargs,),
+                    name="intent-drift-warmup",
+                    daemon=True,
+                ).start()
+            else:
+                self._set_classifier(IntentClassifier(**classifier_kwargs))
+
         self.drift_persistence = drift_persistence
-        self.confidence_threshold = confidence_threshold
-
-        self.intent_anchors = {
-
-    # ============================================================
-    # INTEREST → Motivation, optimism, aspiration (NO evaluation)
-    # ============================================================
-    "interest": [
-        # Excitement & ambition
-        "I am excited for the placement season",
-        "I really want to get placed this year",
-        "I am motivated for placements",
-        "I am looking forward to company visits",
-        "I want to crack a dream company",
-        "I am enthusiastic about the opportunities",
-        "I hope to get a good offer",
-        "I am confident about my preparation",
-        "I am ready for the challenge",
-        "this placement season looks promising",
-
-        # Career goals
-        "getting a job is my top priority",
-        "I want to secure my future",
-        "I want to start my career properly",
-        "I want a stable job after college",
-        "I want industry exposure",
-        "I want to gain real world experience",
-        "I want to prove myself in interviews",
-
-        # Role / company interest
-        "I am interested in software roles",
-        "I want a software developer role",
-        "I am interested in analyst profiles",
-        "I want to join a reputed company",
-        "I am keen on joining an MNC",
-        "startups really interest me",
-        "I am open to good opportunities",
-
-        # Preparation mindset
-        "I am preparing hard for interviews",
-        "I am practicing coding daily",
-        "I am focused on placement preparation",
-        "I am working on my skills",
-        "I am taking placements seriously",
-
-        # Positive emotions / outlook
-        "I feel hopeful",
-        "I feel positive about my chances",
-        "I believe things will work out",
-        "I trust my preparation",
-
-        # Future-oriented optimism (NOT decisions)
-        "I am excited for future placements",
-        "I am planning for next year",
-        "I am looking forward to next season",
-        "I am ready for the next challenge",
-    ],
-
-    # ============================================================
-    # INFORMATION → Facts, rules, process, clarification
-    # ============================================================
-    "information": [
-        # Placement process
-        "how does the placement process work",
-        "what is the placement procedure",
-        "what are the selection rounds",
-        "how many interview rounds are there",
-        "what happens after registration",
-
-        # Eligibility & rules
-        "what is the eligibility criteria",
-        "does cgpa matter",
-        "are backlogs allowed",
-        "is branch eligibility strict",
-        "is there any bond period",
-        "can I sit for multiple companies",
-
-        # Salary & role details
-        "what is the ctc offered",
-        "what is the in hand salary",
-        "what is the average package",
-        "what is the job role",
-        "what responsibilities will I have",
-
-        # Company & logistics
-        "which companies are visiting",
-        "when is the interview",
-        "where is the job location",
-        "is it onsite or remote",
-        "what is the joining date",
-
-        # Preparation queries
-        "how should I prepare for placements",
-        "what topics should I focus on",
-        "what kind of questions are asked",
-        "how difficult are the interviews",
-        "what skills are required",
-    ],
-
-    # ============================================================
-    # COMPARISON → Trade-offs, evaluation between options
-    # ============================================================
-    "comparison": [
-        # Role comparisons
-        "product role or service role",
-        "developer or analyst role",
-        "technical role vs non technical role",
-        "core job vs IT job",
-
-        # Company type comparison
-        "startup or mnc",
-        "big company or small company",
-        "product company vs service company",
-        "mass recruiter vs niche company",
-
-        # Salary vs growth
-        "ctc or learning which is better",
-        "salary vs work life balance",
-        "money or career growth",
-        "brand name or role quality",
-
-        # Offer decisions (comparison, NOT action)
-        "should I take this offer or wait",
-        "is it better to wait for a dream company",
-        "should I accept this job",
-        "should I look for off campus options",
-
-        # Alternatives
-        "job or higher studies",
-        "placements or masters",
-        "on campus or off campus",
-        "job or entrepreneurship",
-
-        # Self evaluation
-        "am I expecting too much",
-        "am I lagging behind others",
-        "is my situation worse than average",
-        "are others also struggling like me",
-    ],
-
-    # ============================================================
-    # COMPLAINT → Anxiety, dissatisfaction, negative evaluation
-    # ============================================================
-    "complaint": [
-        # Anxiety & fear
-        "I am stressed about placements",
-        "I feel anxious about my future",
-        "I am worried I will not get placed",
-        "I feel insecure about my career",
-        "I am scared about what will happen",
-
-        # Emotional exhaustion
-        "this process is exhausting",
-        "I feel mentally drained",
-        "I am burned out",
-        "this pressure is too much",
-        "I am tired of preparing",
-
-        # Dissatisfaction with outcomes
-        "placements are not going well",
-        "companies coming are not good",
-        "packages are very low",
-        "placement cell is not helping",
-        "opportunities are limited",
-
-        # Rejections & self doubt
-        "I am tired of getting rejected",
-        "I failed multiple interviews",
-        "I feel underprepared",
-        "I doubt my abilities",
-        "others are getting placed not me",
-
-        # Comparative dissatisfaction / decline
-        "packages are lower than expected",
-        "this year packages are lower",
-        "offers are worse compared to last year",
-        "placements have gone down this year",
-        "the quality of offers has decreased",
-        "salary trends look bad this year",
-        "packages are not improving",
-        "the pay offered is disappointing",
-        "compensation seems poor this time",
-        "placements are weaker than before",
-
-        # Subtle negative evaluation
-        "this does not look encouraging",
-        "things do not look good this year",
-        "the situation seems worse now",
-        "this feels like a downgrade",
-        "overall outcome looks disappointing",
-
-        # Negative outlook
-        "this season feels bad",
-        "everything feels uncertain",
-        "I regret my decisions",
-        "I feel helpless",
-        "I feel lost about what to do",
-    ],
-
-    # ============================================================
-    # DECISION → Clear action, commitment, exit or acceptance
-    # ============================================================
-    "decision": [
-        # Acceptance
-        "I accepted the offer",
-        "I have decided to join this company",
-        "I am finalizing this job",
-        "I will sign the offer letter",
-        "I am joining this role",
-
-        # Rejection / exit
-        "I will reject this offer",
-        "I am quitting the placement process",
-        "I will stop attending interviews",
-        "I am opting out of placements",
-        "I am done with this process",
-
-        # Alternative paths (ACTIONABLE)
-        "I will try off campus",
-        "I will go for higher studies",
-        "I will prepare for competitive exams",
-        "I will pursue a masters degree",
-        "I will choose another career path",
-
-        # Soft but decisive
-        "I am leaning towards another option",
-        "I have decided to change my plan",
-        "I will not continue with this approach",
-        "I am committing to this choice",
-        "this is my final decision",
-
-        # Closure
-        "this is my final choice",
-        "I am clear about my next step",
-        "I am moving forward with this plan",
-        "I am closing this chapter",
-        "I am done with placements",
-    ],
-}
-
-
-
-        # Precompute anchor embeddings
-        self.intent_embeddings = self._embed_intent_anchors()
-
-        # Conversation state
-        self.intent_history = []
-        self.candidate_intent = None
-        self.candidate_count = 0
+        self.metrics = metrics
+        self.analytics = analytics
+
+        self.smoother = None
+        if smoothing is not None:
+            self.smoother = ScoreSmoother(smoothing, smoothing_alpha, smoothing_window)
+        self.hysteresis = hysteresis
+        self._codes_cache = None  # (labels array, their intent codes)
+
+        # Conversation state. Each domain has its own conversations: the
+        # default one per domain, and sessions keyed by _session_key()
+        self.state = ConversationState(history_size)
+        self._domain_states = {}
+        self.sessions = SessionStore(
+            max_sessions=max_sessions,
+            ttl_seconds=session_ttl,
+            history_size=history_size,
+        )
+        self.state_store = state_store
+        self._state_lock = threading.Lock()
+        # Store-backed sessions: key -> [lock, holders] (see _locked())
+        self._session_locks = {}
+
+        self.max_batch_size = max_batch_size
+        self.max_batch_wait_ms = max_batch_wait_ms
+        self._batcher = None
+
+    # ------------------------------------------------------------------
+
+    def _load_classifier(self, classifier_kwargs):
+        """Background thread: build the classifier and run one warm-up batch."""
+        try:
+            classifier = IntentClassifier(**classifier_kwargs)
+            classifier.encode(["warm up"])
+            self._set_classifier(classifier)
+        except BaseException as exc:
+            self._classifier_future.set_exception(exc)
+
+    def _set_classifier(self, classifier: IntentClassifier):
+        """
+        Register configured domains, then publish the classifier.
+        Intents are numbered in anchor order.
+        """
+        self.vocabulary.extend(classifier.intent_labels)
+        for name, config in self._domain_configs.items():
+            self.domains[name] = self._make_domain(classifier, **config)
+        self._classifier_future.set_result(classifier)
+
+    @property
+    def classifier(self) -> IntentClassifier:
+        """The shared classifier; blocks until a background load finishes."""
+        return self._classifier_future.result()
+
+    def ready(self) -> bool:
+        """True once the model is loaded and warmed up."""
+        future = self._classifier_future
+        return future.done() and future.exception() is None
+
+    def wait_ready(self, timeout: float = None) -> bool:
+        """Wait up to `timeout` seconds for the model; returns ready()."""
+        try:
+            self._classifier_future.result(timeout=timeout)
+        except Exception:
+            pass
+        return self.ready()
+
+    def health(self):
+        """Non-blocking status for health probes."""
+        future = self._classifier_future
+        if not future.done():
+            return {"status": "loading", "ready": False}
+        if future.exception() is not None:
+            return {"status": "error", "ready": False, "error": repr(future.exception())}
+        return {"status": "ok", "ready": True}
+
+    # ------------------------------------------------------------------
+    # Domains: extra anchor sets scored with the same loaded encoder.
+    # domain=None everywhere means the detector's own classifier.
+
+    def register_domain(
+        self,
+        name: str,
+        intent_anchors: dict = None,
+        anchors_path: str = None,
+        confidence_threshold: float = None,
+        drift_persistence: int = None,
+        **classifier_kwargs,
+    ) -> IntentClassifier:
+        """
+        Add (or replace) a named anchor set served by the already loaded
+        model. Thresholds default to the detector's; other keyword
+        arguments go to the domain's IntentClassifier (e.g. scoring,
+        lexical_fast_path). Returns the domain's classifier.
+
+        The domain shares the detector's embedding cache, if it has one
+        (embedding_cache_size), so an utterance scored against several
+        domains is encoded once. Passing embedding_cache_size gives the
+        domain its own cache instead (0: none).
+        """
+        domain = self._make_domain(
+            self.classifier,
+            intent_anchors=intent_anchors,
+            anchors_path=anchors_path,
+            confidence_threshold=confidence_threshold,
+            drift_persistence=drift_persistence,
+            **classifier_kwargs,
+        )
+        self.domains[name] = domain
+        return domain.classifier
+
+    def unregister_domain(self, name: str):
+        """
+        Remove a domain and its default conversation. Its sessions expire
+        from the session store like any other.
+        """
+        del self.domains[name]
+        with self._state_lock:
+            self._domain_states.pop(name, None)
+
+    def _make_domain(
+        self,
+        base: IntentClassifier,
+        intent_anchors: dict = None,
+        anchors_path: str = None,
+        confidence_threshold: float = None,
+        drift_persistence: int = None,
+        **classifier_kwargs,
+    ) -> Domain:
+        classifier = IntentClassifier(
+            base.model_name,
+            confidence_threshold=(
+                base.confidence_threshold if confidence_threshold is None
+                else confidence_threshold
+            ),
+            intent_anchors=intent_anchors,
+            model_revision=base.model_revision,
+            cache_dir=base.cache_dir,
+            backend=base.backend,
+            metrics=base.metrics,
+            anchors_path=anchors_path,
+            model=base.model,
+            projection=base.projection,
+            **classifier_kwargs,
+        )
+        if "embedding_cache_size" not in classifier_kwargs:
+            classifier.embedding_cache = base.embedding_cache
+
+        self.vocabulary.extend(classifier.intent_labels)
+        return Domain(classifier, drift_persistence)
+
+    def _classifier_for(self, domain: str = None) -> IntentClassifier:
+        if domain is None:
+            return self.classifier
+        try:
+            return self.domains[domain].classifier
+        except KeyError:
+            raise KeyError(f"unknown domain {domain!r}") from None
+
+    def _persistence_for(self, domain: str = None) -> int:
+        if domain is not None:
+            persistence = self.domains[domain].drift_persistence
+            if persistence is not None:
+                return persistence
+        return self.drift_persistence
+
+    def detect_domains(self, utterances, domains=None, batch_size: int = 32):
+        """
+        Score utterances against several domains without touching
+        conversation state: domain name -> detect_batch() results.
+        Defaults to every registered domain. Utterances are encoded once
+        and that one embedding matrix is scored against every domain.
+        """
+        utterances = list(utterances)
+        names = list(self.domains) if domains is None else list(domains)
+        rows = list(range(len(utterances)))
+        embedded = self._embed_shared(utterances, {name: rows for name in names}, batch_size)
+        return {
+            name: self._batch_results(
+                utterances,
+                self._classifier_for(name).detect_many(utterances, batch_size, embedded[name]),
+                name,
+            )
+            for name in names
+        }
 
     # ------------------------------------------------------------------
 
-    def _embed_intent_anchors(self):
+    @property
+    def model(self):
+        return self.classifier.model
+
+    @property
+    def intent_anchors(self):
+        return self.classifier.intent_anchors
+
+    @property
+    def confidence_threshold(self):
+        return self.classifier.confidence_threshold
+
+    # Default-conversation state, kept as attributes for existing callers.
+
+    @property
+    def intent_history(self):
+        """Confirmed intents within the kept turns, oldest first."""
+        history = []
+        for _, current, _ in self.state.recent():
+            if current != NO_INTENT and (not history or history[-1] != current):
+                history.append(current)
+        if not history and self.state.current_intent != NO_INTENT:
+            history.append(self.state.current_intent)
+        return [self.vocabulary.label(code) for code in history]
+
+    @property
+    def candidate_intent(self):
+        return self.vocabulary.label(self.state.candidate_intent)
+
+    @property
+    def candidate_count(self):
+        return self.state.candidate_count
+
+    # ------------------------------------------------------------------
+
+    def get_state(self, session_id=None, domain: str = None) -> ConversationState:
         """
-        Compute a single embedding per intent
-        by averaging its anchor sentence embeddings.
+        State of the given session, or of the default conversation.
+        The same session_id in different domains is a different
+        conversation.
         """
-        intent_embeddings = {}
+        if session_id is None:
+            if domain is None:
+                return self.state
+            state = self._domain_states.get(domain)
+            if state is None:
+                state = self._domain_states[domain] = ConversationState(self.sessions.history_size)
+            return state
+
+        key = _session_key(session_id, domain)
+        if self.state_store is None:
+            return self.sessions.get(key)
+
+        data = self.state_store.load(key)
+        if data is None:
+            return ConversationState(self.sessions.history_size)
+        return unpack_snapshot(data, self.vocabulary)
+
+    def _save_state(self, session_id, state: ConversationState, domain: str = None):
+        """Write a session's state back to the state store, if any."""
+        if session_id is not None and self.state_store is not None:
+            self.state_store.save(
+                _session_key(session_id, domain), pack_snapshot(state, self.vocabulary)
+            )
+
+    # ------------------------------------------------------------------
 
-        for intent, anchors in self.intent_anchors.items():
-            emb = self.model.encode(anchors, convert_to_tensor=True)
-            intent_embeddings[intent] = emb.mean(dim=0)
+    def export_state(self, session_id=None, domain: str = None) -> bytes:
+        """
+        Snapshot of a conversation state as compact versioned bytes,
+        loadable by import_state() on any detector.
+        """
+        with self._locked(session_id, domain):
+            return pack_snapshot(self.get_state(session_id, domain), self.vocabulary)
 
-        return intent_embeddings
+    def import_state(self, data: bytes, session_id=None, domain: str = None):
+        """
+        Replace a conversation state with a snapshot from export_state().
+        Raises ValueError if data is not a valid snapshot.
+        """
+        state = unpack_snapshot(data, self.vocabulary)
+
+        with self._locked(session_id, domain):
+            if session_id is None:
+                if domain is None:
+                    self.state = state
+                else:
+                    self._domain_states[domain] = state
+            elif self.state_store is not None:
+                self._save_state(session_id, state, domain)
+            else:
+                self.sessions.put(_session_key(session_id, domain), state)
+
+    def describe_state(self, session_id=None, domain: str = None):
+        """Readable view of a conversation state: labels instead of codes."""
+        label = self.vocabulary.label
+
+        with self._locked(session_id, domain):
+            state = self.get_state(session_id, domain)
+            return {
+                "current_intent": label(state.current_intent),
+                "candidate_intent": label(state.candidate_intent),
+                "candidate_count": state.candidate_count,
+                "turns": state.turns,
+                "recent": [
+                    {
+                        "detected_intent": label(detected),
+                        "current_intent": label(current),
+                        "confidence": round(confidence, 3),
+                    }
+                    for detected, current, confidence in state.recent()
+                ],
+                "transitions": [
+                    {"from": label(a), "to": label(b), "count": count}
+                    for a, b, count in state.transition_counts()
+                ],
+                "smoothed": _smoothed_scores(self.smoother, state, label),
+            }
 
     # ------------------------------------------------------------------
 
-    def _detect_intent(self, utterance: str):
+    def _detect_intent(self, utterance: str, domain: str = None) -> Detection:
         """
         Assigns an intent label to a single utterance
         based on similarity to intent anchors.
         """
-        utter_emb = self.model.encode(utterance, convert_to_tensor=True)
+        return self._classifier_for(domain).detect(utterance)
 
-        best_intent = None
-        best_score = -1.0
+    # ------------------------------------------------------------------
 
-        for intent, anchor_emb in self.intent_embeddings.items():
-            score = util.cos_sim(utter_emb, anchor_emb).item()
-            if score > best_score:
-                best_score = score
-                best_intent = intent
+    def _detect_intents(self, utterances, batch_size: int = 32, domain: str = None):
+        """
+        Assigns an intent label to every utterance in the list,
+        encoding all of them in a single model call.
+        """
+        return self._classifier_for(domain).detect_many(utterances, batch_size=batch_size)
 
-        if best_score < self.confidence_threshold:
-            return "unknown", best_score
+    def _detect_by_domain(self, utterances, domains, batch_size: int = 32):
+        """
+        _detect_intents() for utterances that may target different
+        domains: one encoder pass, then scoring per distinct domain.
+        """
+        groups = {}
+        for i, domain in enumerate(domains):
+            groups.setdefault(domain, []).append(i)
+        if len(groups) == 1:
+            return self._detect_intents(utterances, batch_size, domains[0])
+
+        embedded = self._embed_shared(utterances, groups, batch_size)
+        detections = [None] * len(utterances)
+        for domain, rows in groups.items():
+            found = self._classifier_for(domain).detect_many(
+                [utterances[i] for i in rows], batch_size, embedded[domain]
+            )
+            for i, detection in zip(rows, found):
+                detections[i] = detection
+        return detections
 
-        return best_intent, best_score
+    def _embed_shared(self, utterances, groups, batch_size: int = 32):
+        """
+        Encode utterances for several domains (groups: domain -> row
+        indices), each utterance once per distinct embedding setup;
+        domains built by register_domain() share the detector's, so one
+        pass serves them all. Returns domain -> Embedded of its rows.
+        """
+        setups = {}  # embedding_key -> (classifier, rows)
+        for domain, rows in groups.items():
+            classifier = self._classifier_for(domain)
+            setups.setdefault(classifier.embedding_key, (classifier, set()))[1].update(rows)
+
+        encoded = {}
+        for key, (classifier, rows) in setups.items():
+            rows = sorted(rows)
+            embedded = classifier.embed([utterances[i] for i in rows], batch_size=batch_size)
+            encoded[key] = (embedded, {row: position for position, row in enumerate(rows)})
+
+        shared = {}
+        for domain, rows in groups.items():
+            embedded, position = encoded[self._classifier_for(domain).embedding_key]
+            shared[domain] = embedded.select([position[row] for row in rows])
+        return shared
 
     # ------------------------------------------------------------------
 
-    def update(self, utterance: str):
+    def detect_batch(self, utterances, batch_size: int = 32, domain: str = None):
+        """
+        Detect the intent of many utterances at once without touching
+        conversation state. Returns one result dict per input.
+        """
+        utterances = list(utterances)
+        detections = self._detect_intents(utterances, batch_size=batch_size, domain=domain)
+        return self._batch_results(utterances, detections, domain)
+
+    @staticmethod
+    def _batch_results(utterances, detections, domain: str = None):
+        results = []
+        for utterance, detection in zip(utterances, detections):
+            result = {
+                "utterance": utterance,
+                "detected_intent": detection.intent,
+                "confidence": round(detection.confidence, 3),
+                "stage": detection.stage,
+            }
+            if domain is not None:
+                result["domain"] = domain
+            if detection.matches is not None:
+                result["matched_anchors"] = _matched_anchors(detection)
+            results.append(result)
+
+        return results
+
+    # ------------------------------------------------------------------
+
+    def update(self, utterance: str, session_id=None, domain: str = None):
         """
         Process a new utterance and detect intent drift if it occurs.
+        domain selects a registered anchor set (default: the detector's).
         Returns a structured result.
         """
+        detection = self._detect_intent(utterance, domain)
+        return self._apply(session_id, utterance, detection, domain)
+
+    # ------------------------------------------------------------------
+
+    async def aupdate(self, session_id, utterance: str, domain: str = None):
+        """
+        Async update(). Concurrent calls from all sessions are gathered
+        into shared encoder batches (see MicroBatcher).
+        """
+        if domain is not None:
+            self._classifier_for(domain)  # unknown domains fail here, not in the batch
+
+        loop = asyncio.get_running_loop()
+        if self._batcher is None or self._batcher.loop is not loop:
+            self._batcher = MicroBatcher(
+                self,
+                max_batch_size=self.max_batch_size,
+                max_wait_ms=self.max_batch_wait_ms,
+            )
+
+        return await self._batcher.submit(session_id, utterance, domain)
+
+    # ------------------------------------------------------------------
+
+    async def aclose(self):
+        """Drain and stop the micro-batcher started by aupdate()."""
+        if self._batcher is not None:
+            batcher, self._batcher = self._batcher, None
+            await batcher.close()
+
+    # ------------------------------------------------------------------
+
+    def update_many(
+        self, utterances, session_id=None, batch_size: int = 32, domain: str = None
+    ):
+        """
+        Replay a sequence of utterances through the drift state machine,
+        encoding them in one batch. Returns one result per utterance,
+        identical to calling update() on each in turn.
+        """
+        utterances = list(utterances)
+        detections = self._detect_intents(utterances, batch_size=batch_size, domain=domain)
+
+        with self._locked(session_id, domain):
+            state = self.get_state(session_id, domain)
+            results = [
+                self._advance(state, utterance, detection, domain)
+                for utterance, detection in zip(utterances, detections)
+            ]
+            self._save_state(session_id, state, domain)
+            return results
+
+    # ------------------------------------------------------------------
+
+    def _apply(self, session_id, utterance: str, detection: Detection, domain: str = None):
+        """
+        Apply an already-detected intent to a session's drift state.
+        """
+        with self._locked(session_id, domain):
+            state = self.get_state(session_id, domain)
+            result = self._advance(state, utterance, detection, domain)
+            self._save_state(session_id, state, domain)
+            return result
+
+    @contextlib.contextmanager
+    def _locked(self, session_id=None, domain: str = None):
+        """
+        Serialize turns of one conversation. In-memory states share
+        _state_lock; a state-store session gets a lock of its own, so
+        its load and save never hold up other sessions.
+        """
+        if session_id is None or self.state_store is None:
+            with self._state_lock:
+                yield
+            return
+
+        key = _session_key(session_id, domain)
+        with self._state_lock:
+            entry = self._session_locks.setdefault(key, [threading.Lock(), 0])
+            entry[1] += 1
+        try:
+            with entry[0]:
+                yield
+        finally:
+            with self._state_lock:
+                entry[1] -= 1
+                if not entry[1]:
+                    del self._session_locks[key]
+
+    # ------------------------------------------------------------------
+
+    def _advance(
+        self,
+        state: ConversationState,
+        utterance: str,
+        detection: Detection,
+        domain: str = None,
+    ):
+        """
+        Apply an already-detected intent to a conversation state,
+        recording state-machine metrics when a sink is configured.
+        """
+        metrics = self.metrics
+        if metrics is None:
+            result = self._transition(state, utterance, detection, domain)
+            if self.analytics is not None:
+                self.analytics.add(result)
+            return result
+
+        candidate = state.candidate_intent
+        t0 = time.perf_counter()
+        result = self._transition(state, utterance, detection, domain)
+        metrics.observe("state_machine_seconds", time.perf_counter() - t0)
+
+        metrics.increment("turns_total")
+        if detection.intent == "unknown":
+            metrics.increment("unknown_total")
+        if result["intent_drift"]:
+            metrics.increment("drift_total")
+        elif candidate != NO_INTENT and state.candidate_intent != candidate:
+            metrics.increment("candidate_resets_total")
+
+        if self.analytics is not None:
+            self.analytics.add(result)
+        return result
+
+    # ------------------------------------------------------------------
 
-        detected_intent, confidence = self._detect_intent(utterance)
+    def _transition(
+        self,
+        state: ConversationState,
+        utterance: str,
+        detection: Detection,
+        domain: str = None,
+    ):
+        """
+        The drift state machine: one detected intent -> updated state.
+        """
+        detected_intent = detection.intent
 
         result = {
             "utterance": utterance,
             "detected_intent": detected_intent,
-            "confidence": round(confidence, 3),
+            "confidence": round(detection.confidence, 3),
+            "stage": detection.stage,
             "intent_drift": False,
             "previous_intent": None,
             "current_intent": None,
             "explanation": None,
         }
 
+        if domain is not None:
+            result["domain"] = domain
+        if detection.matches is not None:
+            result["matched_anchors"] = _matched_anchors(detection)
+
+        persistence = self._persistence_for(domain)
+        detected = self.vocabulary.code(detected_intent)
+        if self.smoother is None:
+            self._step(state, detected, detected_intent, result, persistence)
+        else:
+            threshold = self._classifier_for(domain).confidence_threshold
+            effective = self._smoothed_intent(state, detection, detected, result, threshold)
+            label = self.vocabulary.label(effective)
+            self._step(state, effective, label, result, persistence)
+
+        state.record(detected, detection.confidence)
+        return result
+
+    def _smoothed_intent(
+        self,
+        state: ConversationState,
+        detection: Detection,
+        detected: int,
+        result,
+        threshold: float,
+    ) -> int:
+        """
+        Fold the turn into the conversation's smoothed scores and return
+        the intent code the state machine should see: the smoothed
+        leader once it clears the confidence threshold and beats the
+        current intent by the hysteresis margin, otherwise the current
+        intent (UNKNOWN before one is established).
+        """
+        # "UNKNOWN must NEVER participate in drift transitions"
+        if detected == UNKNOWN:
+            return UNKNOWN
+
+        if detection.scores is not None:
+            codes, scores = self._label_codes(detection.labels), detection.scores
+        else:
+            # Lexical decisions only carry the winning intent's score
+            codes = np.array([detected])
+            scores = np.array([detection.confidence], dtype=np.float32)
+
+        smoothed = self.smoother.update(state, codes, scores)
+        leader = int(smoothed.argmax())
+        leader_score = float(smoothed[leader])
+
+        result["smoothed_intent"] = self.vocabulary.label(leader)
+        result["smoothed_score"] = round(leader_score, 3)
+
+        current = state.current_intent
+        if leader_score < threshold:
+            return UNKNOWN if current == NO_INTENT else current
+        if current == NO_INTENT or leader == current:
+            return leader
+
+        current_score = float(smoothed[current]) if current < len(smoothed) else 0.0
+        if leader_score - current_score < self.hysteresis:
+            return current
+        return leader
+
+    def _label_codes(self, labels):
+        """Intent codes of a classifier labels array, cached per snapshot."""
+        cached = self._codes_cache
+        if cached is None or cached[0] is not labels:
+            codes = np.array([self.vocabulary.code(label) for label in labels])
+            cached = self._codes_cache = (labels, codes)
+        return cached[1]
+
+    def _step(
+        self,
+        state: ConversationState,
+        detected: int,
+        detected_intent: str,
+        result,
+        persistence: int,
+    ):
+        """
+        Advance state by one intent code (label detected_intent),
+        filling in result. Drift needs `persistence` consecutive turns.
+        """
+
         # First turn
-        if not self.intent_history:
-            # If start is unknown, we just record it but it's not a "state" we drift FROM later
-            # However, simpler to just start history.
-            # But requirement says "UNKNOWN is NOT an intent state".
-            # If first msg is unknown, let's say current is unknown.
-            if detected_intent == "unknown":
+        if state.current_intent == NO_INTENT:
+            # "UNKNOWN is NOT an intent state": an unknown opening turn is
+            # reported, but there is nothing to drift FROM later.
+            if detected == UNKNOWN:
                 result["current_intent"] = "unknown"
                 result["explanation"] = "Intent unknown."
-                return result
-            
-            self.intent_history.append(detected_intent)
+                return
+
+            state.confirm(detected)
             result["current_intent"] = detected_intent
             result["explanation"] = "Initial intent established."
-            return result
+            return
 
-        last_intent = self.intent_history[-1]
+        last_intent = self.vocabulary.label(state.current_intent)
         result["previous_intent"] = last_intent
 
         # GUARD: If detected intent is UNKNOWN, do nothing.
         # "UNKNOWN must NEVER participate in drift transitions"
-        if detected_intent == "unknown":
+        if detected == UNKNOWN:
             result["current_intent"] = last_intent
             result["explanation"] = "Input out of scope or unclear. Intent state maintained."
-            return result
-        
-        # If we reach here, detected_intent is VALID (not unknown).
-
-        # Special Case: If previous was unknown (e.g. from start), initialize state
-        if last_intent == "unknown":
-            self.intent_history.append(detected_intent)
-            result["current_intent"] = detected_intent
-            result["explanation"] = f"Intent identified: '{detected_intent}'."
-            return result
+            return
 
-        # Normal Drift Logic
-        
         # Same intent → reset candidate drift
-        if detected_intent == last_intent:
-            self.candidate_intent = None
-            self.candidate_count = 0
-            # We don't necessarily need to append to history if it's the same, 
-            # but existing logic did. Let's keep it simple or just not append?
-            # Existing logic appended. Let's append to keep history trace if needed,
-            # or just leave it. The prompt says "DO NOT update internal intent state" for UNKNOWN.
-            # For same intent, state is same.
+        if detected == state.current_intent:
+            state.candidate_intent = NO_INTENT
+            state.candidate_count = 0
             result["current_intent"] = detected_intent
             result["explanation"] = "Intent remains stable."
-            return result
+            return
 
         # Potential new intent → persistence check
-        if detected_intent == self.candidate_intent:
-            self.candidate_count += 1
+        if detected == state.candidate_intent:
+            state.candidate_count += 1
         else:
-            self.candidate_intent = detected_intent
-            self.candidate_count = 1
+            state.candidate_intent = detected
+            state.candidate_count = 1
 
         # Confirm drift only if persistent
-        if self.candidate_count >= self.drift_persistence:
-            self.intent_history.append(detected_intent)
-            self.candidate_intent = None
-            self.candidate_count = 0
+        if state.candidate_count >= persistence:
+            state.confirm(detected)
 
             result["intent_drift"] = True
             result["current_intent"] = detected_intent
@@ -402,19 +892,55 @@ class IntentDriftDetector:
                 f"Intent drift detected: conversation shifted from "
                 f"'{last_intent}' to '{detected_intent}'."
             )
-            return result
+            return
 
         # Drift not yet confirmed
         result["current_intent"] = last_intent
         result["explanation"] = (
             "Possible intent change detected but not yet stable."
         )
-        return result
 
     # ------------------------------------------------------------------
 
-    def reset(self):
-        """Reset conversation state."""
-        self.intent_history = []
-        self.candidate_intent = None
-        self.candidate_count = 0
+    def reset(self, session_id=None, domain: str = None):
+        """Reset conversation state of a session, or of the default conversation."""
+        if session_id is None:
+            with self._state_lock:
+                self.get_state(None, domain).reset()
+        elif self.state_store is not None:
+            with self._locked(session_id, domain):
+                self.state_store.delete(_session_key(session_id, domain))
+        else:
+            self.sessions.discard(_session_key(session_id, domain))
+
+
+def _session_key(session_id, domain: str = None):
+    """
+    Session store key of a conversation. Domain sessions get a
+    "domain<US>session" string key (US = ASCII unit separator), so they
+    also fit the text keys of SQLiteStateStore and stay apart from the
+    plain ids of the default domain.
+    """
+    if domain is None:
+        return session_id
+    return f"{domain}\x1f{session_id}"
+
+
+def _smoothed_scores(smoother, state: ConversationState, label):
+    """Smoothed score per intent label, or None without smoothing."""
+    if smoother is None or state.smoothed is None:
+        return None
+    data = state.smoothed
+    if smoother.mode == "ewma":
+        value = data[0]
+    else:
+        value = data[: min(state.smooth_turns, len(data))].mean(axis=0)
+    return {label(code): round(float(score), 3) for code, score in enumerate(value)}
+
+
+def _matched_anchors(detection: Detection):
+    """Nearest anchors of a k-NN detection, for result dicts."""
+    return [
+        {"anchor": sentence, "intent": intent, "score": round(score, 3)}
+        for sentence, intent, score in detection.matches
+    ]
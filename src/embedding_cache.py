@@ -0,0 +1,99 @@
+import threading
+from collections import OrderedDict
+
+
+def normalize_key(text: str) -> str:
+    """
+    Cache key of an utterance: surrounding whitespace stripped and inner
+    runs collapsed. Whitespace-splitting tokenizers see no difference,
+    so a cached vector is exactly what the encoder would return.
+    """
+    return " ".join(text.split())
+
+
+class EmbeddingCache:
+    """
+    Bounded LRU map of normalized utterance -> embedding.
+
+    Thread-safe. Counts hits and misses so the hit rate on real traffic
+    can be checked before sizing the cache.
+    """
+
+    def __init__(self, max_size: int = 10000, key=normalize_key):
+        """
+        max_size:
+            Maximum number of embeddings kept; the least recently used
+            one is evicted beyond it.
+
+        key:
+            Function mapping an utterance to its cache key. Only fold
+            differences the encoder ignores (e.g. case for uncased models).
+        """
+        if max_size < 1:
+            raise ValueError("max_size must be at least 1")
+
+        self.max_size = max_size
+        self.key = key
+        self.hits = 0
+        self.misses = 0
+
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    # ------------------------------------------------------------------
+
+    def get_many(self, utterances):
+        """
+        Look up every utterance. Returns (keys, vectors) where vectors
+        holds None for each miss.
+        """
+        keys = [self.key(u) for u in utterances]
+        vectors = []
+
+        with self._lock:
+            for key in keys:
+                vector = self._entries.get(key)
+                if vector is not None:
+                    self._entries.move_to_end(key)
+                vectors.append(vector)
+
+            found = sum(v is not None for v in vectors)
+            self.hits += found
+            self.misses += len(keys) - found
+
+        return keys, vectors
+
+    def put_many(self, keys, vectors):
+        """Store vectors under keys, evicting least recently used entries."""
+        with self._lock:
+            for key, vector in zip(keys, vectors):
+                # Own copy, so a cached row does not pin its whole batch
+                vector = vector.copy()
+                vector.flags.writeable = False
+                self._entries[key] = vector
+                self._entries.move_to_end(key)
+
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    # ------------------------------------------------------------------
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        """Size and hit/miss counts."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "max_size": self.max_size,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            }
+
+    def __len__(self):
+        with self._lock:
+            return len(self._entries)
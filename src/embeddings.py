@@ -1,14 +1,47 @@
-from sentence_transformers import SentenceTransformer
 import numpy as np
 
+# "torch": full-precision PyTorch (reference)
+# "int8":  PyTorch with dynamic int8 quantization of all Linear layers (CPU)
+# "onnx":  exported ONNX graph run by onnxruntime (needs optimum[onnxruntime])
+BACKENDS = ("torch", "int8", "onnx")
+
+
+def load_sentence_transformer(model_name: str, backend: str = "torch", revision: str = None):
+    """
+    Load a SentenceTransformer for the requested inference backend.
+    """
+    # Imported here so that importing this package does not pull in
+    # torch/transformers until a model is actually needed.
+    from sentence_transformers import SentenceTransformer
+
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown backend {backend!r}; expected one of {BACKENDS}")
+
+    if backend == "onnx":
+        return SentenceTransformer(model_name, revision=revision, backend="onnx")
+
+    # Dynamic quantization only has CPU kernels
+    device = "cpu" if backend == "int8" else None
+    model = SentenceTransformer(model_name, revision=revision, device=device)
+
+    if backend == "int8":
+        import torch
+
+        model = torch.ao.quantization.quantize_dynamic(
+            model, {torch.nn.Linear}, dtype=torch.qint8
+        )
+
+    return model
+
+
 class EmbeddingModel:
-    def __init__(self, model_name='all-MiniLM-L6-v2'):
+    def __init__(self, model_name='all-MiniLM-L6-v2', backend='torch'):
         """
         Initializes the Sentence-BERT model.
         """
         # We process on CPU by default for broader compatibility in this demo, 
         # but 'device="cuda"' can be used if available.
-        self.model = SentenceTransformer(model_name)
+        self.model = load_sentence_transformer(model_name, backend=backend)
 
     def get_embedding(self, text: str) -> np.ndarray:
         """
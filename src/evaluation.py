@@ -0,0 +1,318 @@
+"""
+Offline evaluation and threshold calibration.
+
+    python -m src.evaluation labeled.jsonl --thresholds 0.2:0.6:0.05 \\
+        --persistence 1,2,3 --cache scores.npz -o report.json
+
+Input is JSONL, one labeled conversation per line:
+    {"conversation_id": "c1",
+     "turns": [{"text": "...", "intent": "interest"},
+               {"text": "...", "intent": "comparison", "drift": true}, ...]}
+
+"intent" is the gold label ("unknown" for out-of-scope turns); turns
+without one are skipped for accuracy. "drift" marks a gold drift turn;
+when absent it is derived from the gold intents with the detector's
+own rule (a known intent differing from the last known one).
+
+Every utterance is encoded once and its best intent and confidence are
+kept (optionally in an .npz cache). The drift state machine is then
+replayed for every (threshold, persistence) setting at once, as NumPy
+arrays over settings x conversations, so a sweep costs one encoder pass
+plus milliseconds per setting. Only the encoder stage is evaluated: the
+lexical fast path and score smoothing are not part of the sweep.
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import sys
+
+import numpy as np
+
+from src.embeddings import BACKENDS
+
+
+def load_corpus(lines):
+    """
+    Parse labeled conversations. Returns a list of conversations, each
+    a list of (text, gold intent or None, gold drift or None).
+    """
+    corpus = []
+    for line_number, line in enumerate(lines, 1):
+        if not line.strip():
+            continue
+        try:
+            record = json.loads(line)
+            turns = []
+            for turn in record["turns"]:
+                if isinstance(turn, str):
+                    turns.append((turn, None, None))
+                else:
+                    turns.append((turn["text"], turn.get("intent"), turn.get("drift")))
+        except (ValueError, KeyError, TypeError) as exc:
+            raise ValueError(f"line {line_number}: invalid conversation: {exc}") from None
+        corpus.append(turns)
+    return corpus
+
+
+def gold_drift(intents):
+    """Gold drift flags derived from gold intents, per the detector's rule."""
+    flags = []
+    last = None
+    for intent in intents:
+        known = intent is not None and intent != "unknown"
+        flags.append(known and last is not None and intent != last)
+        if known:
+            last = intent
+    return flags
+
+
+class EvaluationHarness:
+    """
+    Encodes a labeled corpus once and evaluates many detector settings
+    against it.
+    """
+
+    def __init__(self, classifier, corpus, batch_size: int = 64, cache_path: str = None):
+        """
+        classifier:
+            IntentClassifier whose model and anchors are evaluated.
+
+        corpus:
+            Output of load_corpus().
+
+        cache_path:
+            Optional .npz file for the per-utterance rankings. Reused
+            when it matches the corpus text, model and anchors.
+        """
+        self.corpus = corpus
+
+        texts = [text for conversation in corpus for text, _, _ in conversation]
+        self.labels, best, self.confidence = self._rank(classifier, texts, batch_size, cache_path)
+
+        # Pad conversations to one (n_conversations, max_turns) grid
+        n_conv = len(corpus)
+        max_turns = max((len(c) for c in corpus), default=0)
+        self.valid = np.zeros((n_conv, max_turns), dtype=bool)
+        self.best = np.zeros((n_conv, max_turns), dtype=np.int64)
+        self.best_confidence = np.full((n_conv, max_turns), -np.inf, dtype=np.float32)
+        self.gold_intent = np.full((n_conv, max_turns), -2, dtype=np.int64)  # -2: unlabeled
+        self.gold_drift = np.zeros((n_conv, max_turns), dtype=bool)
+
+        label_rows = {str(label): row for row, label in enumerate(self.labels)}
+        start = 0
+        for c, conversation in enumerate(corpus):
+            n = len(conversation)
+            self.valid[c, :n] = True
+            self.best[c, :n] = best[start:start + n]
+            self.best_confidence[c, :n] = self.confidence[start:start + n]
+            start += n
+
+            intents = [intent for _, intent, _ in conversation]
+            derived = gold_drift(intents)
+            for t, (_, intent, drift) in enumerate(conversation):
+                if intent == "unknown":
+                    self.gold_intent[c, t] = -1
+                elif intent is not None:
+                    # Labels without anchors can never be predicted: -3
+                    self.gold_intent[c, t] = label_rows.get(intent, -3)
+                self.gold_drift[c, t] = derived[t] if drift is None else bool(drift)
+
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def _rank(classifier, texts, batch_size, cache_path):
+        """Best intent row and confidence of every text, cached if asked."""
+        key = None
+        if cache_path is not None:
+            digest = hashlib.sha256()
+            digest.update(json.dumps([
+                classifier.model_name,
+                classifier.model_revision,
+                classifier.backend,
+                classifier.scoring,
+                classifier.long_input,
+                {i: list(s) for i, s in classifier.intent_anchors.items()},
+                texts,
+            ]).encode("utf-8"))
+            projection = classifier.projection
+            if projection is not None:
+                digest.update(projection.dtype.name.encode("ascii"))
+                if projection.components is not None:
+                    digest.update(projection.components.tobytes())
+            key = digest.hexdigest()
+
+            if os.path.exists(cache_path):
+                with np.load(cache_path, allow_pickle=False) as cached:
+                    if str(cached["key"]) == key:
+                        return cached["labels"], cached["best"], cached["confidence"]
+
+        # Each distinct text is encoded once
+        unique = list(dict.fromkeys(texts))
+        labels, best, confidence = classifier.rank_intents(unique, batch_size=batch_size)
+        position = {text: i for i, text in enumerate(unique)}
+        rows = np.array([position[text] for text in texts], dtype=np.int64)
+        best, confidence = best[rows], confidence[rows].astype(np.float32)
+        labels = np.asarray(labels).astype(str)
+
+        if cache_path is not None:
+            np.savez(cache_path, key=key, labels=labels, best=best, confidence=confidence)
+        return labels, best, confidence
+
+    # ------------------------------------------------------------------
+
+    def replay(self, thresholds, persistences):
+        """
+        Run the drift state machine for every (threshold, persistence)
+        pair at once. Returns (predicted intent rows, drift flags), both
+        (n_settings, n_conversations, max_turns); -1 means unknown.
+        """
+        thresholds = np.repeat(np.asarray(thresholds, dtype=np.float32), len(persistences))
+        persistence = np.tile(np.asarray(persistences, dtype=np.int64), len(thresholds) // len(persistences))
+        n_settings = len(thresholds)
+        n_conv, max_turns = self.valid.shape
+
+        # (settings, conversations, turns): per-turn prediction at each threshold
+        predicted = np.where(
+            self.best_confidence[None] >= thresholds[:, None, None],
+            self.best[None],
+            -1,
+        )
+        drift = np.zeros((n_settings, n_conv, max_turns), dtype=bool)
+
+        current = np.full((n_settings, n_conv), -1, dtype=np.int64)
+        candidate = np.full((n_settings, n_conv), -1, dtype=np.int64)
+        count = np.zeros((n_settings, n_conv), dtype=np.int64)
+        required = persistence[:, None]
+
+        for t in range(max_turns):
+            detected = predicted[:, :, t]
+            active = self.valid[None, :, t] & (detected >= 0)
+
+            # First known intent establishes the state
+            establish = active & (current < 0)
+            current = np.where(establish, detected, current)
+
+            ongoing = active & ~establish
+            same = ongoing & (detected == current)
+            change = ongoing & (detected != current)
+
+            count = np.where(change & (detected == candidate), count + 1, count)
+            count = np.where(change & (detected != candidate), 1, count)
+            candidate = np.where(change, detected, candidate)
+
+            confirm = change & (count >= required)
+            drift[:, :, t] = confirm
+            current = np.where(confirm, detected, current)
+
+            reset = same | confirm
+            candidate = np.where(reset, -1, candidate)
+            count = np.where(reset, 0, count)
+
+        return predicted, drift
+
+    def sweep(self, thresholds, persistences):
+        """
+        Metrics for every (threshold, persistence) setting: intent
+        accuracy on labeled turns, unknown rate, and drift precision,
+        recall and F1 against the gold drift turns.
+        """
+        thresholds = [float(t) for t in thresholds]
+        persistences = [int(p) for p in persistences]
+        predicted, drift = self.replay(thresholds, persistences)
+
+        labeled = self.valid & (self.gold_intent != -2)
+        correct = (predicted == self.gold_intent[None]) & labeled[None]
+        unknown = (predicted == -1) & self.valid[None]
+
+        gold = self.gold_drift & self.valid
+        true_positive = (drift & gold[None]).sum(axis=(1, 2))
+        predicted_positive = drift.sum(axis=(1, 2))
+        gold_positive = gold.sum()
+
+        n_turns = max(int(self.valid.sum()), 1)
+        n_labeled = max(int(labeled.sum()), 1)
+
+        results = []
+        for s, (threshold, persistence) in enumerate(
+            (t, p) for t in thresholds for p in persistences
+        ):
+            precision = true_positive[s] / predicted_positive[s] if predicted_positive[s] else 0.0
+            recall = true_positive[s] / gold_positive if gold_positive else 0.0
+            f1 = 2 * precision * recall / (precision + recall) if precision + recall else 0.0
+            results.append({
+                "confidence_threshold": round(threshold, 4),
+                "drift_persistence": persistence,
+                "intent_accuracy": round(float(correct[s].sum()) / n_labeled, 4),
+                "unknown_rate": round(float(unknown[s].sum()) / n_turns, 4),
+                "drift_precision": round(float(precision), 4),
+                "drift_recall": round(float(recall), 4),
+                "drift_f1": round(float(f1), 4),
+                "predicted_drifts": int(predicted_positive[s]),
+            })
+        return results
+
+
+def _parse_range(text: str):
+    """ "0.2:0.6:0.05" -> [0.2, 0.25, ..., 0.6]; "0.3,0.4" -> [0.3, 0.4]."""
+    if ":" in text:
+        start, stop, step = (float(x) for x in text.split(":"))
+        return np.round(np.arange(start, stop + step / 2, step), 6).tolist()
+    return [float(x) for x in text.split(",")]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Sweep threshold/persistence on a labeled corpus")
+    parser.add_argument("corpus", help="labeled JSONL conversations, or - for stdin")
+    parser.add_argument("-o", "--output", default="-", help="JSON report file, or - for stdout")
+    parser.add_argument("--thresholds", default="0.2:0.6:0.05", help="start:stop:step or a,b,c")
+    parser.add_argument("--persistence", default="1,2,3")
+    parser.add_argument("--cache", help=".npz file caching the encoded corpus rankings")
+    parser.add_argument("--batch-size", type=int, default=64)
+    parser.add_argument("--model-name", default="sentence-transformers/all-MiniLM-L6-v2")
+    parser.add_argument("--backend", choices=BACKENDS, default="torch")
+    parser.add_argument("--scoring", choices=("centroid", "knn"), default="centroid")
+    parser.add_argument("--anchors", help="JSON anchors file replacing the built-in anchors")
+    args = parser.parse_args(argv)
+
+    from src.classifier import IntentClassifier
+
+    if args.corpus == "-":
+        corpus = load_corpus(sys.stdin)
+    else:
+        with open(args.corpus, encoding="utf-8") as f:
+            corpus = load_corpus(f)
+
+    classifier = IntentClassifier(
+        args.model_name,
+        backend=args.backend,
+        scoring=args.scoring,
+        anchors_path=args.anchors,
+    )
+    harness = EvaluationHarness(
+        classifier, corpus, batch_size=args.batch_size, cache_path=args.cache
+    )
+    results = harness.sweep(
+        _parse_range(args.thresholds),
+        [int(p) for p in args.persistence.split(",")],
+    )
+
+    report = {
+        "conversations": len(corpus),
+        "turns": int(harness.valid.sum()),
+        "results": results,
+        "best_drift_f1": max(results, key=lambda r: (r["drift_f1"], r["intent_accuracy"])),
+        "best_intent_accuracy": max(results, key=lambda r: (r["intent_accuracy"], r["drift_f1"])),
+    }
+
+    text = json.dumps(report, indent=2)
+    if args.output == "-":
+        print(text)
+    else:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,129 @@
+import math
+import re
+
+import numpy as np
+
+_TOKEN_RE = re.compile(r"[a-z0-9']+")
+
+
+def normalize_text(text: str) -> str:
+    """Lowercase and collapse punctuation/whitespace."""
+    return " ".join(_TOKEN_RE.findall(text.lower()))
+
+
+def _ngrams(text: str):
+    """Word unigrams, word bigrams and within-word character trigrams."""
+    words = _TOKEN_RE.findall(text.lower())
+    features = list(words)
+    features += [f"{a} {b}" for a, b in zip(words, words[1:])]
+    for word in words:
+        padded = f"#{word}#"
+        features += [padded[i:i + 3] for i in range(len(padded) - 2)]
+    return features
+
+
+class LexicalIntentModel:
+    """
+    Cheap first-stage classifier built from the anchor sentences.
+
+    Each intent is a TF-IDF centroid over word and character n-grams.
+    Scoring an utterance is a sparse dot product against those centroids,
+    orders of magnitude cheaper than a transformer forward pass, and
+    anchors repeated (near-)verbatim are recognised by exact lookup.
+    """
+
+    def __init__(self, intent_anchors: dict):
+        self.intent_labels = list(intent_anchors)
+
+        # Exact (normalized) anchor text -> intent, when unambiguous
+        self.exact = {}
+        ambiguous = set()
+        for intent, sentences in intent_anchors.items():
+            for sentence in sentences:
+                key = normalize_text(sentence)
+                if self.exact.get(key, intent) != intent:
+                    ambiguous.add(key)
+                self.exact[key] = intent
+        for key in ambiguous:
+            del self.exact[key]
+
+        docs = [
+            (row, _ngrams(sentence))
+            for row, intent in enumerate(self.intent_labels)
+            for sentence in intent_anchors[intent]
+        ]
+
+        # Vocabulary and inverse document frequencies
+        df = {}
+        for _, features in docs:
+            for feature in set(features):
+                df[feature] = df.get(feature, 0) + 1
+
+        n_docs = len(docs)
+        self.vocab = {feature: col for col, feature in enumerate(df)}
+        self.idf = np.array(
+            [math.log((1 + n_docs) / (1 + df[f])) + 1.0 for f in self.vocab],
+            dtype=np.float32,
+        )
+        # Weight for n-grams never seen in any anchor
+        self.unseen_idf = math.log(1 + n_docs) + 1.0
+
+        # Mean of L2-normalized anchor vectors, then renormalized
+        centroids = np.zeros((len(self.intent_labels), len(self.vocab)), dtype=np.float32)
+        for row, features in docs:
+            cols, weights, norm = self._vectorize(features)
+            centroids[row, cols] += weights / norm
+        centroids /= np.linalg.norm(centroids, axis=1, keepdims=True)
+        self.centroids = centroids
+
+    # ------------------------------------------------------------------
+
+    def _vectorize(self, features):
+        """
+        Sparse TF-IDF vector of known n-grams as (cols, weights), plus the
+        norm over all n-grams so unseen words still dilute the score.
+        """
+        counts = {}
+        for feature in features:
+            counts[feature] = counts.get(feature, 0) + 1
+
+        cols, tfs, unseen_sq = [], [], 0.0
+        for feature, tf in counts.items():
+            col = self.vocab.get(feature)
+            if col is None:
+                unseen_sq += (tf * self.unseen_idf) ** 2
+            else:
+                cols.append(col)
+                tfs.append(tf)
+
+        cols = np.array(cols, dtype=np.intp)
+        weights = np.array(tfs, dtype=np.float32) * self.idf[cols]
+        norm = math.sqrt(float(weights @ weights) + unseen_sq) or 1.0
+        return cols, weights, norm
+
+    # ------------------------------------------------------------------
+
+    def predict(self, utterance: str):
+        """
+        Returns (intent, score, margin): the best intent, its cosine score
+        and the gap to the runner-up. Exact anchor matches score 1.0 with
+        margin 1.0.
+        """
+        intent = self.exact.get(normalize_text(utterance))
+        if intent is not None:
+            return intent, 1.0, 1.0
+
+        cols, weights, norm = self._vectorize(_ngrams(utterance))
+        if len(cols) == 0:
+            return None, 0.0, 0.0
+
+        scores = self.centroids[:, cols] @ (weights / norm)
+        if len(scores) == 1:
+            return self.intent_labels[0], float(scores[0]), float(scores[0])
+
+        second, best = np.argpartition(scores, -2)[-2:]
+        return (
+            self.intent_labels[best],
+            float(scores[best]),
+            float(scores[best] - scores[second]),
+        )
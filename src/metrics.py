@@ -0,0 +1,110 @@
+import threading
+from bisect import bisect_left
+
+# Histogram buckets (upper bounds) for Prometheus export
+SECONDS_BUCKETS = (
+    0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5,
+)
+SIZE_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128, 256, 512)
+
+
+class MetricsSink:
+    """
+    Destination for detector metrics.
+
+    Instrumented code calls increment() for counters and observe() for
+    timings (names ending in _seconds) and other distributions such as
+    batch sizes. Pass metrics=None to the detector to disable
+    instrumentation entirely; the hot path then only pays an `is None`
+    check.
+    """
+
+    def increment(self, name: str, value: int = 1):
+        raise NotImplementedError
+
+    def observe(self, name: str, value: float):
+        raise NotImplementedError
+
+
+class InMemorySink(MetricsSink):
+    """Keeps every counter and observation in memory. Meant for tests."""
+
+    def __init__(self):
+        self.counters = {}
+        self.observations = {}
+        self._lock = threading.Lock()
+
+    def increment(self, name: str, value: int = 1):
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + value
+
+    def observe(self, name: str, value: float):
+        with self._lock:
+            self.observations.setdefault(name, []).append(value)
+
+    def snapshot(self):
+        """Copy of counters and observations."""
+        with self._lock:
+            return {
+                "counters": dict(self.counters),
+                "observations": {k: list(v) for k, v in self.observations.items()},
+            }
+
+
+class PrometheusSink(MetricsSink):
+    """
+    Aggregates counters and fixed-bucket histograms and renders them in
+    the Prometheus text exposition format.
+    """
+
+    def __init__(self, prefix: str = "intent_drift"):
+        self.prefix = prefix
+        self._counters = {}
+        self._histograms = {}  # name -> [bucket counts, sum, count]
+        self._lock = threading.Lock()
+
+    # ------------------------------------------------------------------
+
+    def increment(self, name: str, value: int = 1):
+        with self._lock:
+            self._counters[name] = self._counters.get(name, 0) + value
+
+    def observe(self, name: str, value: float):
+        buckets = SECONDS_BUCKETS if name.endswith("_seconds") else SIZE_BUCKETS
+        index = bisect_left(buckets, value)
+
+        with self._lock:
+            histogram = self._histograms.get(name)
+            if histogram is None:
+                histogram = self._histograms[name] = [[0] * len(buckets), 0.0, 0]
+            if index < len(buckets):
+                histogram[0][index] += 1
+            histogram[1] += value
+            histogram[2] += 1
+
+    # ------------------------------------------------------------------
+
+    def render(self) -> str:
+        """Current values in Prometheus text format."""
+        lines = []
+
+        with self._lock:
+            for name, value in sorted(self._counters.items()):
+                metric = f"{self.prefix}_{name}"
+                lines.append(f"# TYPE {metric} counter")
+                lines.append(f"{metric} {value}")
+
+            for name, (counts, total, count) in sorted(self._histograms.items()):
+                metric = f"{self.prefix}_{name}"
+                buckets = SECONDS_BUCKETS if name.endswith("_seconds") else SIZE_BUCKETS
+                lines.append(f"# TYPE {metric} histogram")
+
+                cumulative = 0
+                for bound, bucket_count in zip(buckets, counts):
+                    cumulative += bucket_count
+                    lines.append(f'{metric}_bucket{{le="{bound}"}} {cumulative}')
+                lines.append(f'{metric}_bucket{{le="+Inf"}} {count}')
+                lines.append(f"{metric}_sum {total}")
+                lines.append(f"{metric}_count {count}")
+
+        return "\n".join(lines) + "\n"
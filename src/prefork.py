@@ -0,0 +1,340 @@
+"""
+Pre-fork worker pool: one model in memory, every core busy.
+
+    pool = PreforkPool(workers=8, drift_persistence=2)
+    result = pool.update("I accepted the offer", session_id="user-42")
+    pool.close()
+
+The parent loads the model and anchors once, moves the weights and the
+anchor matrices into shared memory, then forks the workers. Workers
+only read that memory, so they share one physical copy instead of each
+loading their own. Calls are routed by session id, which keeps every
+conversation on one worker and its state in that worker's memory.
+
+Requires the "fork" start method (Linux, macOS). Anchor edits in the
+parent after the fork are not seen by the workers; build a new pool
+instead.
+"""
+
+import gc
+import os
+import sys
+import threading
+import zlib
+from concurrent.futures import Future
+from multiprocessing import connection, get_context
+from multiprocessing.shared_memory import SharedMemory
+
+import numpy as np
+
+from src.drift_detector import IntentDriftDetector
+
+# Detector methods a worker will run, and whether each is per-session
+ROUTED_METHODS = {
+    "update": True,
+    "update_many": True,
+    "reset": True,
+    "export_state": True,
+    "import_state": True,
+    "describe_state": True,
+    "detect_batch": False,
+}
+
+
+class WorkerDied(RuntimeError):
+    pass
+
+
+class PreforkPool:
+    """
+    Forked detector workers sharing one copy of the model.
+
+    Methods mirror IntentDriftDetector and block for the result;
+    submit() returns a Future instead. Safe to call from many threads.
+    """
+
+    def __init__(
+        self,
+        detector: IntentDriftDetector = None,
+        workers: int = None,
+        threads_per_worker: int = 1,
+        **detector_kwargs,
+    ):
+        """
+        detector:
+            Detector to fork from. Built from detector_kwargs if None.
+            Its sessions must be empty and it must not use a state
+            store (an open database connection does not survive fork).
+
+        workers:
+            Number of worker processes; defaults to the CPU count.
+
+        threads_per_worker:
+            Torch intra-op threads per worker. One per worker with one
+            worker per core avoids oversubscription.
+        """
+        if detector is None:
+            detector = IntentDriftDetector(**detector_kwargs)
+        if detector.state_store is not None:
+            raise ValueError("PreforkPool does not support a detector state_store")
+
+        self.detector = detector
+        self.workers = workers or os.cpu_count() or 1
+        self.threads_per_worker = threads_per_worker
+
+        self._segments = _share_classifier(detector.classifier)
+
+        self._conns = []
+        self._processes = []
+        self._send_locks = []
+        self._pending = []  # per worker: request_id -> Future
+        self._pending_lock = threading.Lock()
+        self._next_id = 0
+        self._round_robin = 0
+        self._closed = False
+
+        # Keep the parent's objects out of the children's GC passes, which
+        # would otherwise write to (and so copy) every page they touch
+        gc.freeze()
+
+        context = get_context("fork")
+        for _ in range(self.workers):
+            parent_conn, child_conn = context.Pipe()
+            process = context.Process(
+                target=_worker_main,
+                args=(detector, child_conn, threads_per_worker),
+                daemon=True,
+            )
+            process.start()
+            child_conn.close()
+
+            self._conns.append(parent_conn)
+            self._processes.append(process)
+            self._send_locks.append(threading.Lock())
+            self._pending.append({})
+
+        gc.unfreeze()
+
+        # Started after forking so no child inherits a half-held lock
+        self._reader = threading.Thread(
+            target=self._read_results, name="prefork-results", daemon=True
+        )
+        self._reader.start()
+
+    # ------------------------------------------------------------------
+
+    def worker_for(self, session_id) -> int:
+        """Index of the worker that owns session_id."""
+        if session_id is None:
+            return 0
+        return zlib.crc32(str(session_id).encode("utf-8")) % self.workers
+
+    def submit(self, method: str, *args, session_id=None, **kwargs) -> Future:
+        """
+        Run detector.<method>(*args, session_id=session_id, **kwargs) on
+        the owning worker. Stateless methods (detect_batch) go
+        round-robin and take no session_id.
+        """
+        if method not in ROUTED_METHODS:
+            raise ValueError(f"method {method!r} cannot run on a worker")
+        if self._closed:
+            raise RuntimeError("pool is closed")
+
+        future = Future()
+
+        with self._pending_lock:
+            if ROUTED_METHODS[method]:
+                worker = self.worker_for(session_id)
+                kwargs["session_id"] = session_id
+            else:
+                worker = self._round_robin
+                self._round_robin = (worker + 1) % self.workers
+
+            request_id = self._next_id
+            self._next_id += 1
+            self._pending[worker][request_id] = future
+
+        if not self._processes[worker].is_alive():
+            self._fail(worker)
+            return future
+
+        try:
+            with self._send_locks[worker]:
+                self._conns[worker].send((request_id, method, args, kwargs))
+        except (OSError, ValueError):
+            self._fail(worker)
+        return future
+
+    # ------------------------------------------------------------------
+
+    def update(self, utterance: str, session_id=None):
+        return self.submit("update", utterance, session_id=session_id).result()
+
+    def update_many(self, utterances, session_id=None, batch_size: int = 32):
+        return self.submit(
+            "update_many", list(utterances), session_id=session_id, batch_size=batch_size
+        ).result()
+
+    def reset(self, session_id=None):
+        return self.submit("reset", session_id=session_id).result()
+
+    def export_state(self, session_id=None) -> bytes:
+        return self.submit("export_state", session_id=session_id).result()
+
+    def import_state(self, data: bytes, session_id=None):
+        return self.submit("import_state", data, session_id=session_id).result()
+
+    def describe_state(self, session_id=None):
+        return self.submit("describe_state", session_id=session_id).result()
+
+    def detect_batch(self, utterances, batch_size: int = 32):
+        return self.submit("detect_batch", list(utterances), batch_size=batch_size).result()
+
+    # ------------------------------------------------------------------
+
+    def close(self, timeout: float = 10.0):
+        """Stop the workers after their queued calls, and free shared memory."""
+        if self._closed:
+            return
+        self._closed = True
+
+        for conn, lock in zip(self._conns, self._send_locks):
+            try:
+                with lock:
+                    conn.send(None)
+            except (OSError, ValueError):
+                pass
+
+        for process in self._processes:
+            process.join(timeout)
+            if process.is_alive():
+                process.terminate()
+                process.join()
+
+        self._reader.join(timeout)
+        for conn in self._conns:
+            conn.close()
+
+        # The parent's arrays still view the segments; detach them first
+        _unshare_classifier(self.detector.classifier)
+        for segment in self._segments:
+            segment.close()
+            segment.unlink()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    # ------------------------------------------------------------------
+
+    def _read_results(self):
+        """Reader thread: resolve futures as workers answer."""
+        live = {conn: i for i, conn in enumerate(self._conns)}
+        sentinels = {p.sentinel: i for i, p in enumerate(self._processes)}
+
+        while live:
+            for ready in connection.wait(list(live) + list(sentinels)):
+                if ready in sentinels:
+                    # Drain answers the worker sent before exiting
+                    worker = sentinels.pop(ready)
+                    conn = self._conns[worker]
+                    while conn in live and conn.poll():
+                        self._deliver(worker, conn)
+                    live.pop(conn, None)
+                    self._fail(worker)
+                elif ready in live:
+                    if not self._deliver(live[ready], ready):
+                        live.pop(ready)
+
+    def _deliver(self, worker: int, conn) -> bool:
+        try:
+            request_id, ok, value = conn.recv()
+        except (EOFError, OSError):
+            return False
+
+        with self._pending_lock:
+            future = self._pending[worker].pop(request_id, None)
+        if future is not None:
+            if ok:
+                future.set_result(value)
+            else:
+                future.set_exception(value)
+        return True
+
+    def _fail(self, worker: int):
+        """Fail every call still waiting on a dead worker."""
+        with self._pending_lock:
+            pending, self._pending[worker] = self._pending[worker], {}
+        for future in pending.values():
+            if not future.done():
+                future.set_exception(WorkerDied(f"worker {worker} exited"))
+
+
+def _worker_main(detector: IntentDriftDetector, conn, threads: int):
+    """Worker process: serve calls from the parent until told to stop."""
+    if "torch" in sys.modules:
+        sys.modules["torch"].set_num_threads(threads)
+
+    while True:
+        try:
+            message = conn.recv()
+        except (EOFError, OSError):
+            return
+        if message is None:
+            return
+
+        request_id, method, args, kwargs = message
+        try:
+            reply = (request_id, True, getattr(detector, method)(*args, **kwargs))
+        except Exception as exc:
+            reply = (request_id, False, exc)
+
+        try:
+            conn.send(reply)
+        except Exception as exc:
+            # Result or exception that does not pickle
+            conn.send((request_id, False, RuntimeError(repr(exc))))
+
+
+def _share_classifier(classifier):
+    """
+    Move a classifier's model weights and anchor arrays into shared
+    memory. Returns the SharedMemory segments, owned by the caller.
+    """
+    model = classifier.model
+    if hasattr(model, "share_memory"):
+        try:
+            model.share_memory()
+        except RuntimeError:
+            # Some backends (e.g. quantized packed weights) cannot move;
+            # copy-on-write after fork still shares them until written.
+            pass
+
+    index = classifier._index
+    segments = []
+
+    def share(array):
+        segment = SharedMemory(create=True, size=max(array.nbytes, 1))
+        shared = np.ndarray(array.shape, dtype=array.dtype, buffer=segment.buf)
+        shared[...] = array
+        segments.append(segment)
+        return shared
+
+    # The snapshot is immutable by convention only; swapping its arrays
+    # for equal shared copies does not change any result
+    index.matrix = share(index.matrix)
+    index.scoring_matrix = index.matrix.astype(np.float32, copy=False)
+    if index.ann is not None:
+        index.ann.vectors = share(index.ann.vectors)
+    return segments
+
+
+def _unshare_classifier(classifier):
+    """Replace shared-memory anchor arrays with private copies."""
+    index = classifier._index
+    index.matrix = np.array(index.matrix)
+    index.scoring_matrix = index.matrix.astype(np.float32, copy=False)
+    if index.ann is not None:
+        index.ann.vectors = np.array(index.ann.vectors)
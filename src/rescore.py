@@ -0,0 +1,160 @@
+"""
+Bulk rescoring of conversation transcripts.
+
+    python -m src.rescore conversations.jsonl -o results.jsonl --workers 8
+
+Input is JSONL, one conversation per line:
+    {"conversation_id": "c1", "turns": ["first message", {"text": "second"}, ...]}
+
+Output is JSONL, one line per conversation in input order:
+    {"conversation_id": "c1", "results": [<update() result>, ...]}
+
+Lines are streamed: only a bounded window of conversations is in flight
+at any time. With --workers > 1, conversations are sharded across a
+process pool in which every worker loads the model once.
+"""
+
+import argparse
+import json
+import multiprocessing
+import sys
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+
+from src.drift_detector import IntentDriftDetector
+from src.embeddings import BACKENDS
+
+# Per-process detector, created by _init_worker
+_detector = None
+
+
+def _init_worker(detector_kwargs):
+    global _detector
+    _detector = IntentDriftDetector(**detector_kwargs)
+
+
+def _turn_text(turn):
+    if isinstance(turn, str):
+        return turn
+    if isinstance(turn, dict):
+        text = turn.get("text", turn.get("utterance"))
+        if isinstance(text, str):
+            return text
+    raise ValueError(f"cannot read utterance from turn {turn!r}")
+
+
+def score_conversation(detector, line: str, batch_size: int = 32):
+    """
+    Score one JSONL conversation line from a fresh drift state.
+    Malformed lines produce an {"error": ...} record instead of raising.
+    """
+    try:
+        record = json.loads(line)
+    except ValueError as exc:
+        return {"conversation_id": None, "error": f"invalid JSON: {exc}"}
+
+    conversation_id = record.get("conversation_id") if isinstance(record, dict) else None
+    try:
+        turns = [_turn_text(turn) for turn in record["turns"]]
+    except (ValueError, KeyError, TypeError) as exc:
+        return {"conversation_id": conversation_id, "error": f"invalid turns: {exc}"}
+
+    detector.reset()
+    results = detector.update_many(turns, batch_size=batch_size)
+    detector.reset()
+
+    return {"conversation_id": conversation_id, "results": results}
+
+
+def _score_chunk(lines, batch_size):
+    return [score_conversation(_detector, line, batch_size) for line in lines]
+
+
+def _chunks(lines, size):
+    lines = (line for line in lines if line.strip())
+    while True:
+        chunk = list(islice(lines, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def rescore(lines, detector_kwargs, workers: int = 1, chunk_size: int = 16, batch_size: int = 32):
+    """
+    Yield one output record per input line, in input order.
+
+    Reads `lines` lazily; with workers > 1 at most 2 * workers chunks of
+    chunk_size conversations are in flight, so memory stays bounded no
+    matter how large the input is.
+    """
+    if workers <= 1:
+        detector = IntentDriftDetector(**detector_kwargs)
+        for chunk in _chunks(lines, chunk_size):
+            for line in chunk:
+                yield score_conversation(detector, line, batch_size)
+        return
+
+    # spawn keeps torch's thread pools out of the forked children
+    context = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(
+        max_workers=workers,
+        mp_context=context,
+        initializer=_init_worker,
+        initargs=(detector_kwargs,),
+    ) as pool:
+        pending = deque()
+        for chunk in _chunks(lines, chunk_size):
+            pending.append(pool.submit(_score_chunk, chunk, batch_size))
+            if len(pending) >= 2 * workers:
+                yield from pending.popleft().result()
+
+        while pending:
+            yield from pending.popleft().result()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Rescore conversation transcripts for intent drift")
+    parser.add_argument("input", help="JSONL conversations file, or - for stdin")
+    parser.add_argument("-o", "--output", default="-", help="JSONL results file, or - for stdout")
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument("--chunk-size", type=int, default=16, help="conversations per worker task")
+    parser.add_argument("--batch-size", type=int, default=32, help="encoder batch size")
+    parser.add_argument("--model-name", default="sentence-transformers/all-MiniLM-L6-v2")
+    parser.add_argument("--drift-persistence", type=int, default=1)
+    parser.add_argument("--confidence-threshold", type=float, default=0.30)
+    parser.add_argument("--backend", choices=BACKENDS, default="torch")
+    parser.add_argument("--lexical-fast-path", action="store_true")
+    parser.add_argument("--anchors", help="JSON anchors file replacing the built-in anchors")
+    args = parser.parse_args(argv)
+
+    detector_kwargs = {
+        "model_name": args.model_name,
+        "drift_persistence": args.drift_persistence,
+        "confidence_threshold": args.confidence_threshold,
+        "backend": args.backend,
+        "lexical_fast_path": args.lexical_fast_path,
+        "anchors_path": args.anchors,
+    }
+
+    src = sys.stdin if args.input == "-" else open(args.input, encoding="utf-8")
+    dst = sys.stdout if args.output == "-" else open(args.output, "w", encoding="utf-8")
+
+    try:
+        for record in rescore(
+            src,
+            detector_kwargs,
+            workers=args.workers,
+            chunk_size=args.chunk_size,
+            batch_size=args.batch_size,
+        ):
+            dst.write(json.dumps(record, ensure_ascii=False) + "\n")
+    finally:
+        if src is not sys.stdin:
+            src.close()
+        if dst is not sys.stdout:
+            dst.close()
+
+
+if __name__ == "__main__":
+    main()
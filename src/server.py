@@ -0,0 +1,344 @@
+"""
+HTTP scoring service for machine-to-machine traffic.
+
+    python -m src.server --port 8000 --workers 4 --max-queue 64
+
+Endpoints (JSON in, JSON out):
+    POST /update  {"session_id": "...", "utterance": "..."}  -> update() result
+    POST /batch   {"utterances": [...], "session_id": "..."} -> {"results": [...]}
+                  (without session_id the batch is scored statelessly)
+                  Both (and /reset) accept an optional "domain" (see --domain).
+    POST /reset   {"session_id": "..."}                       -> {"reset": true}
+    POST /reload-anchors  re-read the --anchors file          -> {"encoded": n}
+                  (POSTs get 503 until the model is loaded, or if it failed to)
+    GET  /health  {"status": "ok" | "loading" | "error", "ready": ...}
+                  (503 until the model is loaded)
+    GET  /metrics  Prometheus text format (with --metrics)
+    GET  /analytics  fleet-wide drift rollup (with --analytics)
+
+Requests run on a fixed worker pool. When every worker is busy and the
+queue is full, new connections are answered with 429 immediately.
+SIGINT/SIGTERM stop accepting connections and drain in-flight requests.
+
+With --state-db, session state lives in a SQLite file instead of process
+memory, so several server processes on one host can share sessions.
+"""
+
+import argparse
+import json
+import signal
+import socket
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, HTTPServer
+
+from src.analytics import DriftAggregator
+from src.anchors import load_intent_anchors
+from src.compression import EmbeddingProjection
+from src.drift_detector import IntentDriftDetector
+from src.embeddings import BACKENDS
+from src.metrics import PrometheusSink
+from src.state_store import SQLiteStateStore
+
+MAX_BODY_BYTES = 1 << 20
+
+# Seconds a client may stay silent mid-request before its worker is freed
+REQUEST_TIMEOUT = 30.0
+
+
+class BadRequest(Exception):
+    pass
+
+
+class DriftRequestHandler(BaseHTTPRequestHandler):
+    server_version = "IntentDrift/1.0"
+
+    def setup(self):
+        # Idle or slow clients must not hold a pool worker indefinitely
+        self.timeout = self.server.request_timeout
+        super().setup()
+
+    # ------------------------------------------------------------------
+
+    def do_GET(self):
+        if self.path == "/health":
+            health = self.server.detector.health()
+            self._send_json(200 if health["ready"] else 503, health)
+        elif self.path == "/metrics" and isinstance(self.server.detector.metrics, PrometheusSink):
+            data = self.server.detector.metrics.render().encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+        elif self.path == "/analytics" and self.server.detector.analytics is not None:
+            self._send_json(200, self.server.detector.analytics.summary())
+        else:
+            self._send_json(404, {"error": f"unknown path {self.path}"})
+
+    # ------------------------------------------------------------------
+
+    def do_POST(self):
+        routes = {
+            "/update": self._update,
+            "/batch": self._batch,
+            "/reset": self._reset,
+            "/reload-anchors": self._reload_anchors,
+        }
+
+        route = routes.get(self.path)
+        if route is None:
+            self._send_json(404, {"error": f"unknown path {self.path}"})
+            return
+
+        detector = self.server.detector
+        if not detector.ready():
+            self._send_json(503, detector.health())
+            return
+
+        try:
+            payload = self._read_json()
+            self._send_json(200, route(detector, payload))
+        except BadRequest as exc:
+            self._send_json(400, {"error": str(exc)})
+        except socket.timeout:
+            self.close_connection = True
+            self._send_json(408, {"error": "timed out reading the request"})
+        except Exception as exc:
+            self.log_error("error handling %s: %r", self.path, exc)
+            self._send_json(500, {"error": "internal server error"})
+
+    # ------------------------------------------------------------------
+
+    def _update(self, detector, payload):
+        session_id = _require(payload, "session_id", str)
+        utterance = _require(payload, "utterance", str)
+        domain = _domain(detector, payload)
+        return detector.update(utterance, session_id=session_id, domain=domain)
+
+    def _batch(self, detector, payload):
+        utterances = _require(payload, "utterances", list)
+        if not all(isinstance(u, str) for u in utterances):
+            raise BadRequest("'utterances' must be a list of strings")
+
+        session_id = None
+        if "session_id" in payload:
+            session_id = _require(payload, "session_id", str)
+        domain = _domain(detector, payload)
+        if session_id is None:
+            return {"results": detector.detect_batch(utterances, domain=domain)}
+        return {
+            "results": detector.update_many(utterances, session_id=session_id, domain=domain)
+        }
+
+    def _reset(self, detector, payload):
+        detector.reset(_require(payload, "session_id", str), domain=_domain(detector, payload))
+        return {"reset": True}
+
+    def _reload_anchors(self, detector, payload):
+        if self.server.anchors_path is None:
+            raise BadRequest("server was started without --anchors")
+        try:
+            intent_anchors = load_intent_anchors(self.server.anchors_path)
+        except (OSError, ValueError) as exc:
+            raise BadRequest(f"could not load anchors: {exc}")
+        return {"encoded": detector.classifier.reload_anchors(intent_anchors)}
+
+    # ------------------------------------------------------------------
+
+    def _read_json(self):
+        try:
+            length = int(self.headers.get("Content-Length", 0))
+        except ValueError:
+            raise BadRequest("invalid Content-Length")
+
+        if length < 0:
+            raise BadRequest("invalid Content-Length")
+        if length > MAX_BODY_BYTES:
+            raise BadRequest("request body too large")
+
+        try:
+            payload = json.loads(self.rfile.read(length) or b"{}")
+        except ValueError:
+            raise BadRequest("request body is not valid JSON")
+
+        if not isinstance(payload, dict):
+            raise BadRequest("request body must be a JSON object")
+        return payload
+
+    def _send_json(self, status: int, body):
+        data = json.dumps(body).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+
+def _require(payload, key, kind):
+    value = payload.get(key)
+    if not isinstance(value, kind):
+        raise BadRequest(f"'{key}' is required and must be a {kind.__name__}")
+    return value
+
+
+def _domain(detector, payload):
+    domain = payload.get("domain")
+    if domain is not None and (not isinstance(domain, str) or domain not in detector.domains):
+        raise BadRequest(f"unknown domain {domain!r}")
+    return domain
+
+
+class DriftServer(HTTPServer):
+    """
+    HTTPServer that handles connections on a bounded thread pool.
+
+    At most workers + max_queue connections are admitted at once; the
+    rest get a 429 straight from the accept loop without touching the pool.
+    """
+
+    def __init__(
+        self,
+        address,
+        detector,
+        workers: int = 4,
+        max_queue: int = 64,
+        anchors_path: str = None,
+        request_timeout: float = REQUEST_TIMEOUT,
+    ):
+        super().__init__(address, DriftRequestHandler)
+        self.detector = detector
+        self.anchors_path = anchors_path
+        self.request_timeout = request_timeout
+        self._pool = ThreadPoolExecutor(
+            max_workers=workers, thread_name_prefix="drift-worker"
+        )
+        self._slots = threading.BoundedSemaphore(workers + max_queue)
+
+    # ------------------------------------------------------------------
+
+    def process_request(self, request, client_address):
+        if not self._slots.acquire(blocking=False):
+            self._reject(request, 429, "Too Many Requests")
+            return
+
+        try:
+            self._pool.submit(self._process, request, client_address)
+        except RuntimeError:
+            # Pool already shut down
+            self._slots.release()
+            self._reject(request, 503, "Service Unavailable")
+
+    def _process(self, request, client_address):
+        try:
+            self.finish_request(request, client_address)
+        except Exception:
+            self.handle_error(request, client_address)
+        finally:
+            self.shutdown_request(request)
+            self._slots.release()
+
+    def _reject(self, request, status: int, reason: str):
+        body = json.dumps({"error": reason}).encode("utf-8")
+        head = (
+            f"HTTP/1.0 {status} {reason}\r\n"
+            "Content-Type: application/json\r\n"
+            "Retry-After: 1\r\n"
+            f"Content-Length: {len(body)}\r\n"
+            "Connection: close\r\n\r\n"
+        ).encode("ascii")
+
+        try:
+            # Consume what the client already sent so closing does not
+            # reset the connection before it reads the response.
+            request.settimeout(0.05)
+            try:
+                request.recv(MAX_BODY_BYTES)
+            except socket.timeout:
+                pass
+            request.sendall(head + body)
+        except OSError:
+            pass
+        self.shutdown_request(request)
+
+    # ------------------------------------------------------------------
+
+    def server_close(self):
+        """Close the listening socket and wait for in-flight requests."""
+        super().server_close()
+        self._pool.shutdown(wait=True)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Intent drift HTTP scoring service")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--max-queue", type=int, default=64)
+    parser.add_argument("--request-timeout", type=float, default=REQUEST_TIMEOUT,
+                        help="seconds a client may stall mid-request")
+    parser.add_argument("--model-name", default="sentence-transformers/all-MiniLM-L6-v2")
+    parser.add_argument("--drift-persistence", type=int, default=1)
+    parser.add_argument("--confidence-threshold", type=float, default=0.30)
+    parser.add_argument("--backend", choices=BACKENDS, default="torch")
+    parser.add_argument("--lexical-fast-path", action="store_true")
+    parser.add_argument("--metrics", action="store_true", help="expose Prometheus metrics on /metrics")
+    parser.add_argument("--analytics", action="store_true",
+                        help="aggregate drift analytics on /analytics")
+    parser.add_argument("--anchors", help="JSON anchors file; POST /reload-anchors re-reads it")
+    parser.add_argument("--state-db", help="SQLite file for session state shared between processes")
+    parser.add_argument("--embedding-cache-size", type=int, default=0,
+                        help="LRU cache of utterance embeddings (0 disables)")
+    parser.add_argument("--projection", help="compact embedding projection (.npz, see src.compression)")
+    parser.add_argument("--domain", action="append", default=[], metavar="NAME=ANCHORS",
+                        help="extra anchor set served by the same model (repeatable)")
+    args = parser.parse_args(argv)
+
+    domains = {}
+    for spec in args.domain:
+        name, sep, path = spec.partition("=")
+        if not sep or not name or not path:
+            parser.error(f"--domain expects NAME=ANCHORS_FILE, got {spec!r}")
+        domains[name] = {"anchors_path": path}
+
+    detector = IntentDriftDetector(
+        model_name=args.model_name,
+        drift_persistence=args.drift_persistence,
+        confidence_threshold=args.confidence_threshold,
+        backend=args.backend,
+        lexical_fast_path=args.lexical_fast_path,
+        metrics=PrometheusSink() if args.metrics else None,
+        background=True,
+        anchors_path=args.anchors,
+        state_store=SQLiteStateStore(args.state_db) if args.state_db else None,
+        embedding_cache_size=args.embedding_cache_size,
+        domains=domains,
+        analytics=DriftAggregator() if args.analytics else None,
+        projection=EmbeddingProjection.load(args.projection) if args.projection else None,
+    )
+    server = DriftServer(
+        (args.host, args.port),
+        detector,
+        workers=args.workers,
+        max_queue=args.max_queue,
+        anchors_path=args.anchors,
+        request_timeout=args.request_timeout,
+    )
+
+    def _stop(signum, frame):
+        # shutdown() blocks until serve_forever() returns, so it must not
+        # run on the thread that is serving.
+        threading.Thread(target=server.shutdown, daemon=True).start()
+
+    signal.signal(signal.SIGINT, _stop)
+    signal.signal(signal.SIGTERM, _stop)
+
+    print(f"Serving intent drift detection on http://{args.host}:{args.port}")
+    try:
+        server.serve_forever()
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
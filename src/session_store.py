@@ -0,0 +1,103 @@
+import threading
+import time
+from collections import OrderedDict
+
+from src.state import HISTORY_SIZE, ConversationState
+
+
+class SessionStore:
+    """
+    Thread-safe map of session id -> ConversationState.
+
+    Memory is bounded two ways: sessions idle for longer than
+    ttl_seconds expire, and once max_sessions is reached the least
+    recently used session is evicted to make room for a new one.
+    """
+
+    def __init__(
+        self,
+        max_sessions: int = 10000,
+        ttl_seconds: float = 3600.0,
+        history_size: int = HISTORY_SIZE,
+    ):
+        """
+        max_sessions:
+            Upper bound on live sessions (LRU eviction beyond it).
+
+        ttl_seconds:
+            Idle time after which a session expires. None disables expiry.
+
+        history_size:
+            Turns kept in each new session's ring buffer.
+        """
+        self.max_sessions = max_sessions
+        self.ttl_seconds = ttl_seconds
+        self.history_size = history_size
+
+        self._sessions = OrderedDict()  # session_id -> (state, last_seen)
+        self._lock = threading.Lock()
+
+    # ------------------------------------------------------------------
+
+    def get(self, session_id) -> ConversationState:
+        """
+        Return the state for session_id, creating a fresh one if the
+        session is new or has expired. Marks the session as used.
+        """
+        now = time.monotonic()
+
+        with self._lock:
+            entry = self._sessions.pop(session_id, None)
+
+            if entry is None or self._expired(entry[1], now):
+                state = ConversationState(self.history_size)
+            else:
+                state = entry[0]
+
+            self._sessions[session_id] = (state, now)
+            self._evict(now)
+
+            return state
+
+    def put(self, session_id, state: ConversationState):
+        """Store state for session_id, replacing any existing one."""
+        now = time.monotonic()
+
+        with self._lock:
+            self._sessions.pop(session_id, None)
+            self._sessions[session_id] = (state, now)
+            self._evict(now)
+
+    # ------------------------------------------------------------------
+
+    def discard(self, session_id):
+        """Forget a session. Unknown ids are ignored."""
+        with self._lock:
+            self._sessions.pop(session_id, None)
+
+    # ------------------------------------------------------------------
+
+    def __contains__(self, session_id):
+        with self._lock:
+            entry = self._sessions.get(session_id)
+            return entry is not None and not self._expired(
+                entry[1], time.monotonic()
+            )
+
+    def __len__(self):
+        with self._lock:
+            return len(self._sessions)
+
+    # ------------------------------------------------------------------
+
+    def _expired(self, last_seen: float, now: float) -> bool:
+        return self.ttl_seconds is not None and now - last_seen > self.ttl_seconds
+
+    def _evict(self, now: float):
+        """Drop expired sessions from the LRU end, then enforce the size cap."""
+        while self._sessions:
+            session_id, (_, last_seen) = next(iter(self._sessions.items()))
+            if len(self._sessions) > self.max_sessions or self._expired(last_seen, now):
+                del self._sessions[session_id]
+            else:
+                break
@@ -0,0 +1,76 @@
+import numpy as np
+
+SMOOTHING_MODES = ("ewma", "window")
+
+
+class ScoreSmoother:
+    """
+    Running per-conversation score vector over intents.
+
+    Each turn's similarity vector (one score per intent, from the
+    classifier) is folded into ConversationState.smoothed, indexed by
+    intent code, so no past turn is re-encoded. "ewma" keeps one
+    exponentially-weighted row; "window" keeps the last `window` rows
+    and averages them. Both cost O(n_intents) per turn (times the fixed
+    window size).
+
+    The smoother holds only settings and is shared by every
+    conversation.
+    """
+
+    def __init__(self, mode: str = "ewma", alpha: float = 0.5, window: int = 4):
+        """
+        alpha:
+            EWMA weight of the newest turn, in (0, 1].
+
+        window:
+            Turns averaged in "window" mode.
+        """
+        if mode not in SMOOTHING_MODES:
+            raise ValueError(f"Unknown smoothing {mode!r}; expected one of {SMOOTHING_MODES}")
+        if not 0.0 < alpha <= 1.0:
+            raise ValueError("alpha must be in (0, 1]")
+        if not 0 < window < 256:
+            raise ValueError("window must be between 1 and 255")
+
+        self.mode = mode
+        self.alpha = alpha
+        self.window = window
+
+    # ------------------------------------------------------------------
+
+    def update(self, state, codes, scores):
+        """
+        Fold one turn into state and return the smoothed vector,
+        indexed by intent code.
+
+        codes:  (n_intents,) intent code of each score
+        scores: (n_intents,) similarity of the turn to each intent
+        """
+        columns = int(np.max(codes)) + 1
+        rows = 1 if self.mode == "ewma" else self.window
+
+        data = state.smoothed
+        if data is None:
+            data = np.zeros((rows, columns), dtype=np.float32)
+        elif data.shape[1] < columns:
+            # New intents since the last turn start from zero
+            data = np.pad(data, ((0, 0), (0, columns - data.shape[1])))
+
+        # Intents missing from this turn (removed at runtime) score zero
+        turn = np.zeros(data.shape[1], dtype=np.float32)
+        turn[codes] = scores
+
+        if self.mode == "ewma":
+            if state.smooth_turns == 0:
+                data[0] = turn
+            else:
+                data[0] += self.alpha * (turn - data[0])
+            value = data[0]
+        else:
+            data[state.smooth_turns % rows] = turn
+            value = data[: min(state.smooth_turns + 1, rows)].mean(axis=0)
+
+        state.smoothed = data
+        state.smooth_turns += 1
+        return value
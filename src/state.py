@@ -0,0 +1,301 @@
+import struct
+import threading
+
+import numpy as np
+
+# Reserved intent codes; real intents are numbered from 0 upwards
+UNKNOWN = 0xFFFF
+NO_INTENT = 0xFFFE
+
+HISTORY_SIZE = 8
+
+# One ring slot: detected intent, intent in force after the turn, confidence
+_TURN = struct.Struct("<HHe")
+# Serialized header: version, history size, current, candidate,
+# candidate count, turns, number of transition entries
+_HEADER = struct.Struct("<BBHHHIH")
+_TRANSITION = struct.Struct("<HHI")
+# Version 2 adds the smoothing block: rows, columns (codes), smoothed turns,
+# then float16 values; version 3 stores them as float32, so a state saved
+# and reloaded every turn smooths exactly like one kept in memory
+_SMOOTHING = struct.Struct("<BHI")
+_SMOOTHING_DTYPES = {2: "<f2", 3: "<f4"}
+_VERSION = 3
+
+
+class IntentVocabulary:
+    """
+    Append-only mapping between intent labels and small integer codes.
+
+    One vocabulary is shared by all conversation states of a detector.
+    Codes are never reused, so states stay valid when intents are added
+    or removed at runtime.
+    """
+
+    def __init__(self, labels=()):
+        self.labels = []
+        self._codes = {"unknown": UNKNOWN}
+        self._lock = threading.Lock()
+        self.extend(labels)
+
+    # ------------------------------------------------------------------
+
+    def code(self, label: str) -> int:
+        """Code of label, assigning the next free one if it is new."""
+        code = self._codes.get(label)
+        if code is not None:
+            return code
+
+        with self._lock:
+            code = self._codes.get(label)
+            if code is None:
+                if len(self.labels) >= NO_INTENT:
+                    raise ValueError("intent vocabulary is full")
+                label = str(label)
+                code = self._codes[label] = len(self.labels)
+                self.labels.append(label)
+            return code
+
+    def extend(self, labels):
+        for label in labels:
+            self.code(label)
+
+    def label(self, code: int):
+        """Label of code; None for NO_INTENT."""
+        if code == UNKNOWN:
+            return "unknown"
+        if code == NO_INTENT:
+            return None
+        return self.labels[code]
+
+    def __len__(self):
+        return len(self.labels)
+
+
+class ConversationState:
+    """
+    Drift state of a single conversation.
+
+    Small and model-free: the shared IntentDriftDetector reads and
+    updates it, one instance per conversation. Intents are stored as
+    IntentVocabulary codes. Only the last history_size turns are kept,
+    in a fixed-size ring, next to a count of every confirmed intent
+    transition, so memory stays bounded however long a conversation
+    runs. to_bytes() packs the whole state into a few dozen bytes.
+
+    With score smoothing (src.smoothing), `smoothed` holds float32 rows
+    indexed by intent code and smooth_turns counts the turns fed to it.
+    """
+
+    __slots__ = (
+        "current_intent",
+        "candidate_intent",
+        "candidate_count",
+        "turns",
+        "transitions",
+        "smoothed",
+        "smooth_turns",
+        "_ring",
+    )
+
+    def __init__(self, history_size: int = HISTORY_SIZE):
+        if not 0 < history_size < 256:
+            raise ValueError("history_size must be between 1 and 255")
+
+        self._ring = bytearray(history_size * _TURN.size)
+        self.reset()
+
+    # ------------------------------------------------------------------
+
+    def reset(self):
+        """Reset conversation state."""
+        self.current_intent = NO_INTENT
+        self.candidate_intent = NO_INTENT
+        self.candidate_count = 0
+        self.turns = 0
+        self.transitions = None  # (from << 16 | to) -> count, once one happens
+        self.smoothed = None
+        self.smooth_turns = 0
+
+    # ------------------------------------------------------------------
+
+    @property
+    def history_size(self) -> int:
+        return len(self._ring) // _TURN.size
+
+    def record(self, detected: int, confidence: float):
+        """Append a turn to the ring, after current_intent was updated."""
+        slot = self.turns % self.history_size
+        _TURN.pack_into(self._ring, slot * _TURN.size, detected, self.current_intent, confidence)
+        self.turns += 1
+
+    def recent(self):
+        """Kept turns, oldest first, as (detected, current, confidence)."""
+        size = self.history_size
+        kept = min(self.turns, size)
+        start = self.turns - kept
+        return [
+            _TURN.unpack_from(self._ring, (i % size) * _TURN.size)
+            for i in range(start, self.turns)
+        ]
+
+    def confirm(self, intent: int):
+        """Make intent the current one, counting the transition."""
+        if self.current_intent != NO_INTENT:
+            if self.transitions is None:
+                self.transitions = {}
+            key = self.current_intent << 16 | intent
+            self.transitions[key] = self.transitions.get(key, 0) + 1
+
+        self.current_intent = intent
+        self.candidate_intent = NO_INTENT
+        self.candidate_count = 0
+
+    def transition_counts(self):
+        """Confirmed transitions as (from, to, count)."""
+        return [
+            (key >> 16, key & 0xFFFF, count)
+            for key, count in (self.transitions or {}).items()
+        ]
+
+    def intent_codes(self):
+        """Every real intent code the state refers to."""
+        codes = {self.current_intent, self.candidate_intent}
+        for detected, current, _ in self.recent():
+            codes.update((detected, current))
+        for from_intent, to_intent, _ in self.transition_counts():
+            codes.update((from_intent, to_intent))
+        if self.smoothed is not None:
+            codes.update(np.flatnonzero(self.smoothed.any(axis=0)).tolist())
+        return codes - {UNKNOWN, NO_INTENT}
+
+    def remapped(self, mapping) -> "ConversationState":
+        """Copy with every real intent code translated through mapping."""
+
+        def translate(code):
+            return code if code >= NO_INTENT else mapping[code]
+
+        state = ConversationState(self.history_size)
+        state.current_intent = translate(self.current_intent)
+        state.candidate_intent = translate(self.candidate_intent)
+        state.candidate_count = self.candidate_count
+        state.turns = self.turns
+        state.smooth_turns = self.smooth_turns
+
+        if self.smoothed is not None:
+            live = np.flatnonzero(self.smoothed.any(axis=0))
+            targets = [mapping[code] for code in live.tolist()]
+            state.smoothed = np.zeros(
+                (len(self.smoothed), max(targets, default=-1) + 1), dtype=np.float32
+            )
+            state.smoothed[:, targets] = self.smoothed[:, live]
+
+        for slot in range(min(self.turns, self.history_size)):
+            detected, current, confidence = _TURN.unpack_from(self._ring, slot * _TURN.size)
+            _TURN.pack_into(
+                state._ring,
+                slot * _TURN.size,
+                translate(detected),
+                translate(current),
+                confidence,
+            )
+
+        if self.transitions is not None:
+            state.transitions = {
+                translate(from_intent) << 16 | translate(to_intent): count
+                for from_intent, to_intent, count in self.transition_counts()
+            }
+
+        return state
+
+    # ------------------------------------------------------------------
+
+    def to_bytes(self) -> bytes:
+        """Compact binary encoding; see from_bytes()."""
+        transitions = self.transition_counts()
+        kept = min(self.turns, self.history_size)
+
+        parts = [
+            _HEADER.pack(
+                _VERSION,
+                self.history_size,
+                self.current_intent,
+                self.candidate_intent,
+                min(self.candidate_count, 0xFFFF),
+                self.turns,
+                len(transitions),
+            ),
+            # Slots fill from 0, so the first `kept` slots are the live ones
+            bytes(self._ring[: kept * _TURN.size]),
+        ]
+        parts.extend(_TRANSITION.pack(*entry) for entry in transitions)
+
+        smoothed = self.smoothed
+        if smoothed is None:
+            parts.append(_SMOOTHING.pack(0, 0, 0))
+        else:
+            parts.append(_SMOOTHING.pack(*smoothed.shape, self.smooth_turns))
+            parts.append(smoothed.astype(_SMOOTHING_DTYPES[_VERSION]).tobytes())
+        return b"".join(parts)
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> "ConversationState":
+        """Inverse of to_bytes(). Raises ValueError on malformed input."""
+        try:
+            (
+                version,
+                history_size,
+                current,
+                candidate,
+                candidate_count,
+                turns,
+                n_transitions,
+            ) = _HEADER.unpack_from(data)
+        except struct.error as exc:
+            raise ValueError(f"truncated conversation state: {exc}") from None
+
+        if version != 1 and version not in _SMOOTHING_DTYPES:
+            raise ValueError(f"unsupported conversation state version {version}")
+
+        state = cls(history_size)
+        kept = min(turns, history_size) * _TURN.size
+        offset = _HEADER.size
+        end = offset + kept + n_transitions * _TRANSITION.size
+
+        if version >= 2:
+            try:
+                rows, columns, smooth_turns = _SMOOTHING.unpack_from(data, end)
+            except struct.error:
+                raise ValueError("conversation state has the wrong length") from None
+            smoothing_dtype = np.dtype(_SMOOTHING_DTYPES[version])
+            smoothing_start = end + _SMOOTHING.size
+            end = smoothing_start + rows * columns * smoothing_dtype.itemsize
+
+        if len(data) != end:
+            raise ValueError("conversation state has the wrong length")
+
+        state._ring[:kept] = data[offset:offset + kept]
+        offset += kept
+
+        if version >= 2 and rows:
+            state.smoothed = (
+                np.frombuffer(
+                    data, dtype=smoothing_dtype, count=rows * columns, offset=smoothing_start
+                )
+                .astype(np.float32)
+                .reshape(rows, columns)
+            )
+            state.smooth_turns = smooth_turns
+
+        state.current_intent = current
+        state.candidate_intent = candidate
+        state.candidate_count = candidate_count
+        state.turns = turns
+
+        if n_transitions:
+            state.transitions = {}
+            transitions = data[offset:offset + n_transitions * _TRANSITION.size]
+            for from_intent, to_intent, count in _TRANSITION.iter_unpack(transitions):
+                state.transitions[from_intent << 16 | to_intent] = count
+
+        return state
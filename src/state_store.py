@@ -0,0 +1,199 @@
+import sqlite3
+import struct
+import threading
+import time
+
+from src.state import ConversationState, IntentVocabulary
+
+# Snapshot envelope: magic, version, number of intent labels
+_MAGIC = b"IDS"
+_ENVELOPE = struct.Struct("<3sBB")
+_VERSION = 1
+
+
+def pack_snapshot(state: ConversationState, vocabulary: IntentVocabulary) -> bytes:
+    """
+    Serialize a conversation state for another process.
+
+    Intent codes are local to a detector's vocabulary, so the snapshot
+    carries the labels it refers to and renumbers them 0..n-1. The
+    reader maps them back onto its own vocabulary.
+    """
+    codes = sorted(state.intent_codes())
+    if len(codes) > 255:
+        raise ValueError("conversation state refers to too many intents")
+
+    labels = [vocabulary.label(code).encode("utf-8") for code in codes]
+    parts = [_ENVELOPE.pack(_MAGIC, _VERSION, len(labels))]
+    for label in labels:
+        if len(label) > 255:
+            raise ValueError("intent label too long for a snapshot")
+        parts.append(bytes((len(label),)) + label)
+
+    local = state.remapped({code: i for i, code in enumerate(codes)})
+    parts.append(local.to_bytes())
+    return b"".join(parts)
+
+
+def unpack_snapshot(data: bytes, vocabulary: IntentVocabulary) -> ConversationState:
+    """Inverse of pack_snapshot(). Raises ValueError on malformed input."""
+    data = bytes(data)
+    try:
+        magic, version, n_labels = _ENVELOPE.unpack_from(data)
+    except struct.error:
+        raise ValueError("truncated snapshot") from None
+
+    if magic != _MAGIC:
+        raise ValueError("not a conversation state snapshot")
+    if version != _VERSION:
+        raise ValueError(f"unsupported snapshot version {version}")
+
+    offset = _ENVELOPE.size
+    mapping = {}
+    for i in range(n_labels):
+        if offset >= len(data):
+            raise ValueError("truncated snapshot")
+        end = offset + 1 + data[offset]
+        if end > len(data):
+            raise ValueError("truncated snapshot")
+        mapping[i] = vocabulary.code(data[offset + 1:end].decode("utf-8"))
+        offset = end
+
+    state = ConversationState.from_bytes(data[offset:])
+    try:
+        return state.remapped(mapping)
+    except KeyError:
+        raise ValueError("snapshot refers to an intent it does not name") from None
+
+
+class StateStore:
+    """
+    Where conversation snapshots live between turns.
+
+    Values are opaque bytes from pack_snapshot(). A store shared by
+    several workers lets any worker serve any turn of a conversation,
+    so load balancers need no sticky sessions. Implementations must be
+    safe to call from several threads.
+    """
+
+    def load(self, session_id: str):
+        """Snapshot bytes of session_id, or None if it has none."""
+        raise NotImplementedError
+
+    def save(self, session_id: str, data: bytes):
+        raise NotImplementedError
+
+    def delete(self, session_id: str):
+        """Forget a session. Unknown ids are ignored."""
+        raise NotImplementedError
+
+
+class InMemoryStateStore(StateStore):
+    """Snapshots in a dict. Process-local; mainly for tests."""
+
+    def __init__(self):
+        self._snapshots = {}
+        self._lock = threading.Lock()
+
+    def load(self, session_id: str):
+        with self._lock:
+            return self._snapshots.get(session_id)
+
+    def save(self, session_id: str, data: bytes):
+        with self._lock:
+            self._snapshots[session_id] = bytes(data)
+
+    def delete(self, session_id: str):
+        with self._lock:
+            self._snapshots.pop(session_id, None)
+
+    def __len__(self):
+        with self._lock:
+            return len(self._snapshots)
+
+
+class SQLiteStateStore(StateStore):
+    """
+    Snapshots in a SQLite file.
+
+    Every process that opens the same file sees the same sessions, which
+    makes it a local stand-in for a shared cache such as Redis. The
+    database runs in WAL mode, so readers do not block the writer.
+    """
+
+    def __init__(self, path: str, ttl_seconds: float = 3600.0, timeout: float = 5.0):
+        """
+        path:
+            Database file, created if missing. ":memory:" keeps it
+            private to this store.
+
+        ttl_seconds:
+            Snapshots not saved for this long are ignored by load() and
+            removed by purge(). None disables expiry.
+
+        timeout:
+            Seconds to wait for another process's write lock.
+        """
+        self.path = path
+        self.ttl_seconds = ttl_seconds
+
+        self._conn = sqlite3.connect(path, timeout=timeout, check_same_thread=False)
+        self._lock = threading.Lock()
+
+        with self._lock, self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS sessions ("
+                " session_id TEXT PRIMARY KEY,"
+                " state BLOB NOT NULL,"
+                " updated REAL NOT NULL)"
+            )
+
+    # ------------------------------------------------------------------
+
+    def load(self, session_id: str):
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT state, updated FROM sessions WHERE session_id = ?",
+                (session_id,),
+            ).fetchone()
+
+        if row is None or self._expired(row[1], time.time()):
+            return None
+        return row[0]
+
+    def save(self, session_id: str, data: bytes):
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO sessions (session_id, state, updated) VALUES (?, ?, ?)",
+                (session_id, bytes(data), time.time()),
+            )
+
+    def delete(self, session_id: str):
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM sessions WHERE session_id = ?", (session_id,))
+
+    # ------------------------------------------------------------------
+
+    def purge(self) -> int:
+        """Delete expired snapshots; returns how many were removed."""
+        if self.ttl_seconds is None:
+            return 0
+        with self._lock, self._conn:
+            cursor = self._conn.execute(
+                "DELETE FROM sessions WHERE updated < ?",
+                (time.time() - self.ttl_seconds,),
+            )
+            return cursor.rowcount
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    def __len__(self):
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM sessions").fetchone()[0]
+
+    def _expired(self, updated: float, now: float) -> bool:
+        return self.ttl_seconds is not None and now - updated > self.ttl_seconds
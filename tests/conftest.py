@@ -0,0 +1,41 @@
+import zlib
+
+import numpy as np
+import pytest
+
+from src.classifier import IntentClassifier
+from src.drift_detector import IntentDriftDetector
+
+DIM = 64
+
+
+class HashingEncoder:
+    """
+    Stand-in for a SentenceTransformer: a normalized bag of hashed words,
+    so sentences sharing words are similar. Deterministic and instant.
+    """
+
+    max_seq_length = 32
+    tokenizer = None
+
+    def encode(self, sentences, batch_size=32, convert_to_numpy=True, normalize_embeddings=True):
+        single = isinstance(sentences, str)
+        texts = [sentences] if single else list(sentences)
+
+        vectors = np.zeros((len(texts), DIM), dtype=np.float32)
+        for row, text in enumerate(texts):
+            for word in text.lower().split():
+                vectors[row, zlib.crc32(word.strip(".,!?").encode("utf-8")) % DIM] += 1.0
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        vectors /= np.maximum(norms, 1e-12)
+        return vectors[0] if single else vectors
+
+
+def make_classifier(**kwargs):
+    kwargs.setdefault("cache_dir", None)
+    return IntentClassifier("hashing-stub", model=HashingEncoder(), **kwargs)
+
+
+@pytest.fixture
+def detector():
+    return IntentDriftDetector(classifier=make_classifier(), drift_persistence=2)
@@ -0,0 +1,23 @@
+import os
+
+from tests.conftest import make_classifier
+
+
+def _entries(cache_dir):
+    return sorted(name for name in os.listdir(cache_dir) if name.startswith("anchors-"))
+
+
+def test_edits_replace_the_cache_entry(tmp_path):
+    classifier = make_classifier(cache_dir=str(tmp_path))
+    assert len(_entries(tmp_path)) == 1
+
+    classifier.add_anchors("interest", ["I really want a product role"])
+    classifier.add_anchors("interest", ["dream job at a startup"])
+    classifier.remove_intent("complaint")
+    entries = _entries(tmp_path)
+    assert len(entries) == 1
+
+    # A cold start with the edited anchors loads that entry
+    reloaded = make_classifier(cache_dir=str(tmp_path), intent_anchors=classifier.intent_anchors)
+    assert _entries(tmp_path) == entries
+    assert (reloaded.intent_matrix == classifier.intent_matrix).all()
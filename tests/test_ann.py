@@ -0,0 +1,37 @@
+import numpy as np
+
+from src.ann import IVFIndex
+from src.compression import EmbeddingProjection
+
+from tests.conftest import make_classifier
+
+
+def _unit(n, dim, seed=0):
+    vectors = np.random.default_rng(seed).standard_normal((n, dim)).astype(np.float32)
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+def test_float16_vectors_stay_float16():
+    vectors = _unit(3000, 16)
+    queries = vectors[:5]
+
+    for exact_below in (4096, 100):
+        index = IVFIndex(vectors.astype(np.float16), exact_below=exact_below, n_probe=64)
+        assert index.vectors.dtype == np.float16
+
+        ids, scores = index.search(queries, 3)
+        assert scores.dtype == np.float32
+        assert ids[:, 0].tolist() == list(range(5))
+
+
+def test_projected_knn_index_is_compact():
+    projection = EmbeddingProjection(dtype="float16")
+    classifier = make_classifier(scoring="knn", knn_k=3, projection=projection)
+    index = classifier._index
+
+    assert index.ann.vectors.dtype == np.float16
+    assert index.matrix.dtype == np.float16
+    assert index.scoring_matrix.dtype == np.float32
+    full = make_classifier(scoring="knn", knn_k=3)
+    for text in ("compare TCS and Infosys", "what is the weather"):
+        assert classifier.detect(text).intent == full.detect(text).intent
@@ -0,0 +1,64 @@
+import numpy as np
+
+from src.chunking import Chunker, combine_chunks
+
+LONG = " ".join(f"Sentence number {i} is filler text." for i in range(30))
+
+
+def test_short_text_is_one_chunk():
+    assert Chunker(16).split("hello there") == (["hello there"], [2])
+
+
+def test_cap_keeps_start_and_end():
+    chunker = Chunker(30, max_turn_tokens=30)
+    chunks, counts = chunker.split(LONG + " I accepted the offer.")
+
+    assert sum(counts) <= 30
+    assert chunks[0].startswith("Sentence number 0")
+    assert chunks[-1].endswith("I accepted the offer.")
+
+
+def test_cap_smaller_than_one_sentence():
+    chunks, counts = Chunker(64, max_turn_tokens=6).split(LONG + " I accepted the offer.")
+    assert sum(counts) <= 6
+    assert chunks[-1].endswith("offer.")
+
+
+def test_uncapped_keeps_every_word():
+    chunks, counts = Chunker(12).split(LONG)
+    assert " ".join(chunks).split() == LONG.split()
+    assert max(counts) <= 12
+
+
+def test_combine_weighted():
+    values = np.array([[1.0, 0.0], [0.0, 1.0], [1.0, 1.0]], dtype=np.float32)
+    pooled = combine_chunks(values, [0, 0, 1], [3, 1, 2], 2, "weighted")
+    np.testing.assert_allclose(pooled, [[0.75, 0.25], [1.0, 1.0]])
+
+
+class CharTokenizer:
+    """One token per character, like a subword tokenizer on random text."""
+
+    def __call__(self, texts, add_special_tokens=False):
+        return {"input_ids": [list(text) for text in texts]}
+
+
+def test_single_oversized_word_keeps_one_chunk():
+    chunker = Chunker(64, max_turn_tokens=100, tokenizer=CharTokenizer())
+    chunks, counts = chunker.split("x" * 3000)
+    assert len(chunks) == 1 and counts[0] <= 100
+    assert chunks[0] == "x" * 100
+
+
+def test_oversized_word_in_batch_stays_aligned():
+    from src.drift_detector import IntentDriftDetector
+    from tests.conftest import make_classifier
+
+    classifier = make_classifier(long_input="max", max_turn_tokens=100)
+    classifier.chunker.tokenizer = CharTokenizer()
+    detector = IntentDriftDetector(classifier=classifier)
+
+    assert detector.update("x" * 3000)["detected_intent"]
+    results = detector.detect_batch(["x" * 3000, "I accepted the offer"])
+    alone = detector.detect_batch(["I accepted the offer"])
+    assert results[1]["confidence"] == alone[0]["confidence"]
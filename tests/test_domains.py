@@ -0,0 +1,64 @@
+from src.state_store import InMemoryStateStore
+from src.drift_detector import IntentDriftDetector
+
+from tests.conftest import make_classifier
+
+HR_ANCHORS = {
+    "leave": ["I need a day off", "apply for leave"],
+    "payroll": ["my salary slip is wrong", "when is payday"],
+}
+
+
+def test_sessions_are_separate_per_domain(detector):
+    detector.register_domain("hr", intent_anchors=HR_ANCHORS, confidence_threshold=0.0)
+
+    assert detector.update("I need a day off", session_id="u", domain="hr")["current_intent"] == "leave"
+    result = detector.update("compare TCS and Infosys", session_id="u")
+    assert result["previous_intent"] is None
+    assert detector.describe_state("u", domain="hr")["turns"] == 1
+    assert detector.describe_state("u")["turns"] == 1
+
+    detector.reset("u", domain="hr")
+    assert detector.describe_state("u", domain="hr")["turns"] == 0
+    assert detector.describe_state("u")["turns"] == 1
+
+
+def test_domain_sessions_in_state_store():
+    store = InMemoryStateStore()
+    detector = IntentDriftDetector(classifier=make_classifier(), state_store=store)
+    detector.register_domain("hr", intent_anchors=HR_ANCHORS)
+
+    detector.update("I need a day off", session_id="u", domain="hr")
+    detector.update("compare TCS and Infosys", session_id="u")
+    assert detector.describe_state("u", domain="hr")["current_intent"] == "leave"
+    assert detector.describe_state("u")["current_intent"] != "leave"
+
+
+def test_domains_share_only_an_enabled_cache(detector):
+    assert detector.register_domain("hr", intent_anchors=HR_ANCHORS).embedding_cache is None
+    assert detector.classifier.embedding_cache is None
+
+    own = detector.register_domain("hr2", intent_anchors=HR_ANCHORS, embedding_cache_size=5)
+    assert own.embedding_cache.max_size == 5
+
+    cached = IntentDriftDetector(classifier=make_classifier(embedding_cache_size=100))
+    shared = cached.register_domain("hr", intent_anchors=HR_ANCHORS)
+    assert shared.embedding_cache is cached.classifier.embedding_cache
+
+    cached.detect_domains(["when is payday"], domains=[None, "hr"])
+    assert cached.classifier.embedding_cache.stats()["misses"] == 1
+
+
+def test_domains_encode_each_utterance_once(detector):
+    detector.register_domain("hr", intent_anchors=HR_ANCHORS, confidence_threshold=0.0)
+    calls = []
+    encode = detector.classifier.model.encode
+    detector.classifier.model.encode = lambda texts, **kw: calls.append(list(texts)) or encode(texts, **kw)
+
+    utterances = ["when is payday", "compare TCS and Infosys"]
+    scored = detector.detect_domains(utterances, domains=[None, "hr"])
+    assert calls == [utterances]
+
+    detector.classifier.model.encode = encode
+    for name, results in scored.items():
+        assert results == detector.detect_batch(utterances, domain=name)
@@ -0,0 +1,19 @@
+from src.anchors import DEFAULT_INTENT_ANCHORS
+from src.benchmark import NOISE_UTTERANCES
+
+from tests.conftest import make_classifier
+
+OUT_OF_SCOPE = NOISE_UTTERANCES + ["what is the weather", "Which league is better?"]
+
+
+def test_out_of_scope_input_reaches_the_encoder():
+    classifier = make_classifier(lexical_fast_path=True)
+    for detection in classifier.detect_many(OUT_OF_SCOPE):
+        assert detection.stage == "encoder"
+
+
+def test_exact_anchor_repeats_skip_the_encoder():
+    classifier = make_classifier(lexical_fast_path=True)
+    for intent, sentences in DEFAULT_INTENT_ANCHORS.items():
+        detection = classifier.detect(sentences[0].upper() + "!")
+        assert (detection.intent, detection.stage) == (intent, "lexical")
@@ -0,0 +1,41 @@
+import multiprocessing
+
+import pytest
+
+from src.drift_detector import IntentDriftDetector
+from src.prefork import PreforkPool
+
+from tests.conftest import make_classifier
+
+pytestmark = pytest.mark.skipif(
+    "fork" not in multiprocessing.get_all_start_methods(), reason="needs fork"
+)
+
+TURNS = [
+    "I want to work at a big product company",
+    "what is the salary there",
+    "compare the salary of TCS and Infosys",
+    "which one is better, TCS or Infosys",
+    "I accepted the offer",
+]
+
+
+def test_update_many_matches_detector():
+    expected = IntentDriftDetector(classifier=make_classifier(), drift_persistence=2)
+    with PreforkPool(
+        IntentDriftDetector(classifier=make_classifier(), drift_persistence=2), workers=2
+    ) as pool:
+        results = pool.update_many(TURNS, session_id="abc")
+        state = pool.describe_state("abc")
+
+    assert results == expected.update_many(TURNS, session_id="abc")
+    assert state["turns"] == len(TURNS)
+
+
+def test_update_routes_by_session():
+    with PreforkPool(IntentDriftDetector(classifier=make_classifier()), workers=2) as pool:
+        for turn in TURNS:
+            pool.update(turn, session_id="a")
+        assert pool.describe_state("a")["turns"] == len(TURNS)
+        assert pool.describe_state("b")["turns"] == 0
+        assert len(pool.detect_batch(TURNS, batch_size=2)) == len(TURNS)
@@ -0,0 +1,77 @@
+import http.client
+import json
+import socket
+import threading
+from concurrent.futures import Future
+
+import pytest
+
+from src.server import DriftServer
+
+
+@pytest.fixture
+def serve():
+    servers = []
+
+    def start(detector, **kwargs):
+        server = DriftServer(("127.0.0.1", 0), detector, workers=2, max_queue=2, **kwargs)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        servers.append(server)
+        return server.server_address[1]
+
+    yield start
+    for server in servers:
+        server.shutdown()
+        server.server_close()
+
+
+def post(port, path, body):
+    conn = http.client.HTTPConnection("127.0.0.1", port, timeout=10)
+    conn.request("POST", path, json.dumps(body), {"Content-Type": "application/json"})
+    response = conn.getresponse()
+    return response.status, json.loads(response.read())
+
+
+def test_update(serve, detector):
+    port = serve(detector)
+    status, body = post(port, "/update", {"session_id": "s", "utterance": "what is the salary"})
+    assert status == 200 and body["current_intent"]
+
+
+def test_batch_rejects_non_string_session_id(serve, detector):
+    port = serve(detector)
+    status, body = post(port, "/batch", {"utterances": ["a"], "session_id": [1]})
+    assert status == 400 and "session_id" in body["error"]
+
+
+def test_failed_model_load_is_503(serve, detector):
+    failed = Future()
+    failed.set_exception(RuntimeError("no model"))
+    detector._classifier_future = failed
+    port = serve(detector)
+    status, body = post(port, "/update", {"session_id": "s", "utterance": "hi"})
+    assert status == 503 and body["status"] == "error"
+
+
+def test_unexpected_error_is_500(serve, detector, monkeypatch):
+    def broken(*args, **kwargs):
+        raise RuntimeError("boom")
+
+    monkeypatch.setattr(detector, "update", broken)
+    port = serve(detector)
+    status, _ = post(port, "/update", {"session_id": "s", "utterance": "hi"})
+    assert status == 500
+
+
+def test_negative_content_length_is_rejected(serve, detector):
+    port = serve(detector)
+    with socket.create_connection(("127.0.0.1", port), timeout=5) as sock:
+        sock.sendall(b"POST /update HTTP/1.0\r\nContent-Length: -1\r\n\r\n")
+        assert sock.recv(1024).startswith(b"HTTP/1.0 400")
+
+
+def test_stalled_client_times_out(serve, detector):
+    port = serve(detector, request_timeout=0.2)
+    with socket.create_connection(("127.0.0.1", port), timeout=5) as sock:
+        sock.sendall(b"POST /update HTTP/1.0\r\nContent-Length: 100\r\n\r\n{")
+        assert sock.recv(1024).startswith(b"HTTP/1.0 408")
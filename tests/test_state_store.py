@@ -0,0 +1,74 @@
+import asyncio
+import threading
+
+from src.drift_detector import IntentDriftDetector
+from src.state_store import InMemoryStateStore
+
+from tests.conftest import make_classifier
+
+
+class StallingStore(InMemoryStateStore):
+    """Loads of session "slow" block until released."""
+
+    def __init__(self):
+        super().__init__()
+        self.stalled = threading.Event()
+        self.release = threading.Event()
+
+    def load(self, session_id):
+        if session_id == "slow":
+            self.stalled.set()
+            self.release.wait(5)
+        return super().load(session_id)
+
+
+def test_store_io_does_not_block_other_sessions():
+    store = StallingStore()
+    detector = IntentDriftDetector(classifier=make_classifier(), state_store=store)
+
+    slow = threading.Thread(target=detector.update, args=("compare TCS and Infosys", "slow"))
+    slow.start()
+    try:
+        assert store.stalled.wait(5)
+        assert detector.update("compare TCS and Infosys", session_id="fast")["previous_intent"] is None
+        assert detector.update_many(["compare TCS and Infosys"], session_id="fast2")
+    finally:
+        store.release.set()
+        slow.join(5)
+    assert detector.describe_state("slow")["turns"] == 1
+    assert not detector._session_locks
+
+
+def test_batched_store_turns_leave_the_loop_free():
+    store = StallingStore()
+    detector = IntentDriftDetector(classifier=make_classifier(), state_store=store)
+
+    async def run():
+        slow = asyncio.ensure_future(detector.aupdate("slow", "compare TCS and Infosys"))
+        while not store.stalled.is_set():
+            await asyncio.sleep(0.01)
+        # The loop still runs while the store is stalled
+        await asyncio.sleep(0.01)
+        store.release.set()
+        await slow
+        await detector.aclose()
+
+    asyncio.run(asyncio.wait_for(run(), 5))
+
+
+def test_smoothing_survives_the_store_exactly():
+    utterances = [
+        "compare TCS and Infosys",
+        "which is better TCS or Infosys",
+        "when is the Infosys drive",
+        "I want to join Infosys",
+        "I accepted the Infosys offer",
+    ]
+    stored = IntentDriftDetector(
+        classifier=make_classifier(), state_store=InMemoryStateStore(), smoothing="ewma"
+    )
+    one_by_one = [stored.update(u, session_id="a") for u in utterances]
+    batched = stored.update_many(utterances, session_id="b")
+
+    assert one_by_one == batched
+    assert stored.describe_state("a") == stored.describe_state("b")